@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the parallel export on a synthetic users table
+
+Rows are generated from the user_data.csv rows, so no database is
+needed; each worker generates, redacts and writes its own partition.
+
+Usage: ./benchmark_export.py [ROWS] [MAX_WORKERS]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+write_partition = __import__('export_users').write_partition
+
+
+def load_template(file_path: str = 'user_data.csv') -> list:
+    """
+    Returns the data rows of user_data.csv
+    """
+    with open(file_path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [tuple(row) for row in reader]
+
+
+def synthetic_rows(template: list, start: int, stop: int):
+    """
+    Yields rows `start` to `stop` of the synthetic table
+    """
+    for i in range(start, stop):
+        name, email, *rest = template[i % len(template)]
+        yield (name, f"{i}.{email}", *rest)
+
+
+def export_synthetic(template: list, start: int, stop: int,
+                     file_path: str) -> int:
+    """
+    Worker: redacts one synthetic partition to `file_path`
+    """
+    return write_partition(synthetic_rows(template, start, stop), file_path)
+
+
+def run(template: list, rows: int, workers: int, output_dir: str) -> float:
+    """
+    Exports `rows` rows with `workers` processes
+    Returns:
+        elapsed seconds
+    """
+    partitions = workers * 4
+    step = -(-rows // partitions)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(export_synthetic, template, low,
+                            min(low + step, rows),
+                            os.path.join(output_dir, f"part-{i:05d}.log"))
+            for i, low in enumerate(range(0, rows, step))
+        ]
+        assert sum(f.result() for f in futures) == rows
+    return time.perf_counter() - start
+
+
+def main():
+    """
+    Prints rows/sec and speedup from 1 to MAX_WORKERS processes
+    """
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    template = load_template()
+    baseline = None
+    workers = 1
+    while True:
+        with tempfile.TemporaryDirectory() as output_dir:
+            elapsed = run(template, rows, workers, output_dir)
+        baseline = baseline or elapsed
+        print("{:>3} workers {:>8.2f}s {:>12,.0f} rows/sec {:>6.2f}x".format(
+            workers, elapsed, rows / elapsed, baseline / elapsed))
+        if workers >= max_workers:
+            break
+        workers = min(workers * 2, max_workers)
+
+
+if __name__ == '__main__':
+    main()
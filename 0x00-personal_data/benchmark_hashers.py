@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Hash and verify latency percentiles of every registered hasher
+
+Usage: ./benchmark_hashers.py [SAMPLES]
+"""
+import sys
+import time
+HASHERS = __import__('hashers').HASHERS
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """
+    Returns the `fraction` percentile of sorted `samples`
+    """
+    index = min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))
+    return samples[index]
+
+
+def measure(function, samples: int) -> list:
+    """
+    Returns the sorted latencies, in milliseconds, of `samples` calls
+    """
+    latencies = []
+    for i in range(samples):
+        start = time.perf_counter()
+        function(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+def main():
+    """
+    Prints p50/p90/p99 hash and verify latencies per backend
+    """
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print("{:<15} {:<7} {:>10} {:>10} {:>10}".format(
+        'backend', 'op', 'p50 ms', 'p90 ms', 'p99 ms'))
+    for name, hasher in HASHERS.items():
+        hashed = hasher.hash("MyAmazingPassw0rd")
+        operations = {
+            'hash': lambda i: hasher.hash(f"MyAmazingPassw0rd{i}"),
+            'verify': lambda i: hasher.verify(hashed, "MyAmazingPassw0rd"),
+        }
+        for op, function in operations.items():
+            latencies = measure(function, samples)
+            print("{:<15} {:<7} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+                name, op, percentile(latencies, 0.5),
+                percentile(latencies, 0.9), percentile(latencies, 0.99)))
+
+
+if __name__ == '__main__':
+    main()
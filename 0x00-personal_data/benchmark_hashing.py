@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Benchmark of bcrypt hashes/sec against the number of workers
+
+Usage: ./benchmark_hashing.py [MAX_WORKERS] [BACKEND]
+"""
+import os
+import sys
+import time
+HashingService = __import__('encrypt_password').HashingService
+
+
+def hashes_per_second(workers: int, backend: str, count: int) -> float:
+    """
+    Hashes `count` passwords with `workers` workers
+    """
+    service = HashingService(workers=workers, backend=backend)
+    try:
+        passwords = [f"MyAmazingPassw0rd{i}" for i in range(count)]
+        start = time.perf_counter()
+        service.hash_many(passwords)
+        return count / (time.perf_counter() - start)
+    finally:
+        service.shutdown()
+
+
+def main():
+    """
+    Prints hashes/sec and speedup from 1 to MAX_WORKERS workers
+    """
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    backend = sys.argv[2] if len(sys.argv) > 2 else 'thread'
+    baseline = None
+    workers = 1
+    while True:
+        rate = hashes_per_second(workers, backend, workers * 4)
+        baseline = baseline or rate
+        print("{:>3} workers {:>8.2f} hashes/sec {:>6.2f}x".format(
+            workers, rate, rate / baseline))
+        if workers >= max_workers:
+            break
+        workers = min(workers * 2, max_workers)
+
+
+if __name__ == '__main__':
+    main()
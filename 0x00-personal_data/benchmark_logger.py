@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Checks that the cost of a log call does not grow with the number of
+get_logger() calls
+"""
+import os
+import sys
+import time
+get_logger = __import__('filtered_logger').get_logger
+
+
+def cost_per_call(calls: int = 20000) -> float:
+    """
+    Returns the average seconds spent in one logger.info call
+    """
+    logger = get_logger()
+    start = time.perf_counter()
+    for i in range(calls):
+        logger.info("name=Bob;email=bob@dylan.com;ssn=%s;", i)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    """
+    Logs after 1, 10 and 100 get_logger() calls
+    """
+    sys.stderr = open(os.devnull, 'w')
+    baseline = cost_per_call()
+    for repeat in (1, 10, 100):
+        for _ in range(repeat):
+            logger = get_logger()
+        cost = cost_per_call()
+        print("{:>3} get_logger() calls: {} handler(s), {:.2f} us/call, "
+              "{:.2f}x".format(repeat, len(logger.handlers), cost * 1e6,
+                               cost / baseline), file=sys.__stdout__)
+        assert len(logger.handlers) == 1
+        assert cost < baseline * 2
+
+
+if __name__ == '__main__':
+    main()
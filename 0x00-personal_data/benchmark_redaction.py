@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the log redaction path
+"""
+import csv
+import logging
+import random
+import re
+import sys
+import time
+filter_datum = __import__('filtered_logger').filter_datum
+RedactingFormatter = __import__('filtered_logger').RedactingFormatter
+PII_FIELDS = __import__('filtered_logger').PII_FIELDS
+get_redaction_engine = __import__('filtered_logger').get_redaction_engine
+StructuredRedactingFormatter = __import__(
+    'filtered_logger').StructuredRedactingFormatter
+
+
+def load_payloads(file_path: str = 'user_data.csv') -> list:
+    """
+    Reads every row of the CSV file as a dict
+    Args:
+        file_path: path to a CSV file shaped like user_data.csv
+    Returns:
+        list of {field: value} dicts
+    """
+    with open(file_path, newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def load_messages(file_path: str = 'user_data.csv') -> list:
+    """
+    Renders every row of the CSV file as a log message
+    Args:
+        file_path: path to a CSV file shaped like user_data.csv
+    Returns:
+        list of `key=value;` log lines
+    """
+    return ['; '.join(f"{field}={value}"
+                      for field, value in payload.items()) + ';'
+            for payload in load_payloads(file_path)]
+
+
+def legacy_filter_datum(fields, redaction, message, separator):
+    """
+    The original, uncompiled implementation of filter_datum
+    """
+    pattern = f'({"|".join(fields)})=[^{separator}]*'
+    return re.sub(pattern, f'\\1={redaction}', message)
+
+
+def lines_per_second(redact, messages: list, rounds: int) -> float:
+    """
+    Times `redact` over `messages`, `rounds` times
+    Returns:
+        number of lines redacted per second
+    """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            redact(message)
+    return len(messages) * rounds / (time.perf_counter() - start)
+
+
+def random_message(keys: list, size: int, rng: random.Random) -> str:
+    """
+    Builds a log line made to hit the corner cases of the pattern:
+    keys glued to field names, `=` inside values, spaces and empty pairs
+    """
+    alphabet = 'ab=; x'
+    parts = []
+    for _ in range(size):
+        key = rng.choice(keys + [''])
+        prefix = rng.choice(['', ' ', 'my', 'a'])
+        value = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 6)))
+        parts.append(rng.choice([f"{prefix}{key}={value}", value]))
+    return rng.choice([';', '; ']).join(parts)
+
+
+def differential_check(samples: int = 20000, seed: int = 0):
+    """
+    Asserts that the tokenizing engine matches the regex engine
+    byte for byte on random messages
+    """
+    rng = random.Random(seed)
+    configs = [
+        (PII_FIELDS, '***', ';'),
+        (('a', 'ab', 'b'), 'xxx', ';'),
+        (('email', 'date_of_birth'), '', ';'),
+        (('a.b', 'x'), '***', ';'),
+        (('a', 'x'), '***', '; '),
+        (('a', 'b_'), '***', '='),
+        (('a', 'x'), '***', '|'),
+    ]
+    for fields, redaction, separator in configs:
+        regex = get_redaction_engine(fields, redaction, separator, 'regex')
+        tokenize = get_redaction_engine(fields, redaction, separator,
+                                        'tokenize')
+        keys = list(fields) + ['name', 'ip', 'ab']
+        for _ in range(samples):
+            message = random_message(keys, rng.randint(0, 8), rng)
+            expected = regex.redact(message)
+            assert tokenize.redact(message) == expected, (fields, message)
+    print("differential check: {} messages identical".format(
+        samples * len(configs)))
+
+
+def mode_throughput(rounds: int):
+    """
+    Prints lines/sec of both engines for 5, 50 and 500 fields per line
+    """
+    for size in (5, 50, 500):
+        keys = [f"field_{i}" for i in range(size)]
+        fields = tuple(keys[::2])
+        messages = [';'.join(f"{key}=value{n}" for key in keys) + ';'
+                    for n in range(20)]
+        for mode in ('regex', 'tokenize'):
+            engine = get_redaction_engine(fields, '***', ';', mode)
+            rate = lines_per_second(engine.redact, messages,
+                                    max(1, rounds // size))
+            print("{:>3} fields/line {:<10} {:>12,.0f} lines/sec".format(
+                size, mode, rate))
+
+
+def formatter_throughput(rounds: int):
+    """
+    Prints records/sec of the text and the structured formatters
+    """
+    payloads = load_payloads()
+    messages = load_messages()
+    text = RedactingFormatter(PII_FIELDS)
+    structured = StructuredRedactingFormatter(PII_FIELDS)
+    cases = [('text formatter', text, messages),
+             ('structured formatter', structured, payloads)]
+    for name, formatter, items in cases:
+        def format_item(item, formatter=formatter):
+            # A fresh record each time: records cache their redaction
+            return formatter.format(logging.LogRecord(
+                "user_data", logging.INFO, None, None, item, None, None))
+        rate = lines_per_second(format_item, items, rounds)
+        print("{:<28} {:>12,.0f} records/sec".format(name, rate))
+
+
+def main():
+    """
+    Compares the legacy and the compiled redaction paths
+    """
+    messages = load_messages()
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    formatter = RedactingFormatter(PII_FIELDS)
+
+    def format_record(message):
+        record = logging.LogRecord("user_data", logging.INFO, None, None,
+                                   message, None, None)
+        return formatter.format(record)
+
+    paths = {
+        'legacy filter_datum': lambda m: legacy_filter_datum(
+            PII_FIELDS, '***', m, ';'),
+        'filter_datum': lambda m: filter_datum(PII_FIELDS, '***', m, ';'),
+        'RedactingFormatter.format': format_record,
+        'tokenize engine': get_redaction_engine(
+            PII_FIELDS, '***', ';', 'tokenize').redact,
+    }
+    for name, redact in paths.items():
+        rate = lines_per_second(redact, messages, rounds)
+        print("{:<28} {:>12,.0f} lines/sec".format(name, rate))
+    formatter_throughput(rounds)
+    differential_check()
+    mode_throughput(rounds * 50)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,38 +2,225 @@
 """
 Password encryption module
 """
-import bcrypt
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+hashers = __import__('hashers')
 
 
-def hash_password(password: str) -> bytes:
+# bcrypt work factor used when BCRYPT_ROUNDS is not set
+DEFAULT_ROUNDS = hashers.DEFAULT_BCRYPT_ROUNDS
+
+
+def get_rounds(rounds: int = None) -> int:
     """
-    Hashes a password using bcrypt
+    Returns the target bcrypt work factor
     Args:
-        password: The password to hash
+        rounds: explicit work factor, takes precedence over the
+                BCRYPT_ROUNDS environment variable
     Returns:
-        A salted, hashed password as a byte string
+        The work factor new hashes are created with
     """
-    # Convert the password string to bytes
-    password_bytes = password.encode('utf-8')
+    return hashers.bcrypt_rounds(rounds)
 
-    # Generate a salt and hash the password
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
 
-    return hashed
+def hash_password(password: str, rounds: int = None) -> bytes:
+    """
+    Hashes a password using the bcrypt hasher of the registry
+    Args:
+        password: The password to hash
+        rounds: bcrypt work factor, see get_rounds
+    Returns:
+        A salted, hashed password as a byte string
+    """
+    if rounds is None:
+        hasher = hashers.get_hasher('bcrypt')
+    else:
+        hasher = hashers.BcryptHasher(rounds)
+    return hasher.hash(password).encode('ascii')
 
 
 def is_valid(hashed_password: bytes, password: str) -> bool:
     """
     Validates that the provided password matches the hashed password
     Args:
-        hashed_password: The hashed password
+        hashed_password: The hashed password, of any registered scheme
         password: The password to validate
     Returns:
         True if the password matches the hash, False otherwise
     """
-    # Convert the password string to bytes
-    password_bytes = password.encode('utf-8')
+    return hashers.verify_password(hashed_password, password)
+
 
-    # Check if the password matches the hash
-    return bcrypt.checkpw(password_bytes, hashed_password)
+def needs_rehash(hashed_password: bytes, rounds: int = None) -> bool:
+    """
+    Checks if a hash is not bcrypt or was made with a different work
+    factor
+    Args:
+        hashed_password: The hashed password, as bytes or str
+        rounds: target work factor, see get_rounds
+    Returns:
+        True if the hash should be replaced, False otherwise
+    """
+    hasher = hashers.identify_hasher(hashed_password)
+    if not isinstance(hasher, hashers.BcryptHasher):
+        return True
+    try:
+        cost = int(hashers._to_str(hashed_password).split('$')[2])
+    except (IndexError, ValueError):
+        return True
+    return cost != get_rounds(rounds)
+
+
+def is_valid_and_rehash(hashed_password: bytes, password: str,
+                        rounds: int = None) -> Tuple[bool, Optional[bytes]]:
+    """
+    Validates a password and upgrades its hash to the target work factor
+    Args:
+        hashed_password: The hashed password
+        password: The password to validate
+        rounds: target work factor, see get_rounds
+    Returns:
+        (valid, new_hash) tuple: new_hash is a fresh hash to store when
+        the password is valid and the stored hash needs rehashing,
+        None otherwise
+    """
+    if not is_valid(hashed_password, password):
+        return False, None
+    if needs_rehash(hashed_password, rounds):
+        return True, hash_password(password, rounds)
+    return True, None
+
+
+class HashingService:
+    """
+    Runs hash_password and is_valid on a pool of workers
+
+    bcrypt releases the GIL, so the default thread backend hashes on
+    several cores at once; the process backend is there for bcrypt
+    builds that do not.
+    """
+
+    BACKENDS = {
+        'thread': ThreadPoolExecutor,
+        'process': ProcessPoolExecutor,
+    }
+
+    def __init__(self, workers: int = None, max_pending: int = None,
+                 backend: str = 'thread', timeout: float = None,
+                 rounds: int = None):
+        """
+        Args:
+            workers: number of workers, defaults to the number of CPUs
+            max_pending: maximum number of queued or running jobs,
+                         defaults to 4 per worker
+            backend: 'thread' or 'process'
+            timeout: seconds to wait for room in the queue,
+                     None waits forever
+            rounds: bcrypt work factor, see get_rounds
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown hashing backend: {backend}")
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self.rounds = get_rounds(rounds)
+        self._executor = self.BACKENDS[backend](max_workers=self.workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _submit(self, function, *args) -> Future:
+        """
+        Queues a job once there is room for it
+        Raises:
+            TimeoutError: if the queue stays full for `timeout` seconds
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("Hashing queue is full")
+        try:
+            future = self._executor.submit(function, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash_password_async(self, password: str) -> Future:
+        """
+        Hashes a password in the pool
+        Returns:
+            Future resolving to the hashed password
+        """
+        return self._submit(hash_password, password, self.rounds)
+
+    def is_valid_async(self, hashed_password: bytes,
+                       password: str) -> Future:
+        """
+        Validates a password in the pool
+        Returns:
+            Future resolving to True if the password matches the hash
+        """
+        return self._submit(is_valid, hashed_password, password)
+
+    def hash_many(self, passwords: List[str]) -> List[bytes]:
+        """
+        Hashes a batch of passwords in the pool
+        Returns:
+            The hashed passwords, in the order of `passwords`
+        """
+        futures = [self.hash_password_async(password)
+                   for password in passwords]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stops the workers
+        """
+        self._executor.shutdown(wait=wait)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_hashing_service() -> HashingService:
+    """
+    Returns the shared HashingService, configured from HASH_WORKERS,
+    HASH_MAX_PENDING and HASH_BACKEND
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = HashingService(
+                workers=int(os.getenv('HASH_WORKERS', 0)) or None,
+                max_pending=int(os.getenv('HASH_MAX_PENDING', 0)) or None,
+                backend=os.getenv('HASH_BACKEND', 'thread')
+            )
+        return _service
+
+
+def hash_password_async(password: str) -> Future:
+    """
+    Hashes a password on the shared HashingService
+    Returns:
+        Future resolving to the hashed password
+    """
+    return get_hashing_service().hash_password_async(password)
+
+
+def is_valid_async(hashed_password: bytes, password: str) -> Future:
+    """
+    Validates a password on the shared HashingService
+    Returns:
+        Future resolving to True if the password matches the hash
+    """
+    return get_hashing_service().is_valid_async(hashed_password, password)
+
+
+def hash_many(passwords: List[str]) -> List[bytes]:
+    """
+    Hashes a batch of passwords on the shared HashingService
+    Returns:
+        The hashed passwords, in the order of `passwords`
+    """
+    return get_hashing_service().hash_many(passwords)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Parallel PII-safe export of the users table
+
+The table is split into key ranges, each range is read and redacted
+by a worker process and written to its own part file.
+
+Usage: ./export_users.py OUTPUT [--workers N] [--partitions N] [--ordered]
+"""
+import argparse
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+connect_db = __import__('filtered_logger').connect_db
+get_db = __import__('filtered_logger').get_db
+redact_rows = __import__('filtered_logger').redact_rows
+stream_rows = __import__('filtered_logger').stream_rows
+
+
+FIELDS = ['name', 'email', 'phone', 'ssn', 'password', 'ip',
+          'last_login', 'user_agent']
+# Indexed in main.sql: the range bounds are read with ORDER BY on it
+PARTITION_KEY = 'email'
+BATCH_SIZE = 1000
+
+
+def partition_ranges(db, partitions: int, key: str = PARTITION_KEY) -> list:
+    """
+    Splits the users table into key ranges of similar size
+    Args:
+        db: database connection
+        partitions: number of ranges wanted
+        key: column the table is partitioned on
+    Returns:
+        list of (low, high) bounds, None meaning unbounded. Low is
+        inclusive, high exclusive; rows with a NULL key go to the
+        first range.
+    """
+    cursor = db.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM users WHERE {key} IS NOT NULL;")
+    total = cursor.fetchone()[0]
+    bounds = []
+    for i in range(1, partitions):
+        cursor.execute(f"SELECT {key} FROM users WHERE {key} IS NOT NULL "
+                       f"ORDER BY {key} LIMIT 1 OFFSET %s;",
+                       (i * total // partitions,))
+        row = cursor.fetchone()
+        if row is not None and (not bounds or row[0] != bounds[-1]):
+            bounds.append(row[0])
+    cursor.close()
+    lows = [None] + bounds
+    highs = bounds + [None]
+    return list(zip(lows, highs))
+
+
+def range_query(low, high, key: str = PARTITION_KEY,
+                ordered: bool = False) -> tuple:
+    """
+    Builds the query selecting one key range, sorted on the key only
+    when the export is ordered
+    Returns:
+        (query, parameters) tuple
+    """
+    conditions = []
+    params = []
+    if low is not None:
+        conditions.append(f"{key} >= %s")
+        params.append(low)
+    if high is not None:
+        conditions.append(f"({key} < %s OR {key} IS NULL)"
+                          if low is None else f"{key} < %s")
+        params.append(high)
+    query = "SELECT {} FROM users".format(', '.join(FIELDS))
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    if ordered:
+        query += f" ORDER BY {key}"
+    return query + ";", tuple(params)
+
+
+def write_partition(rows, file_path: str) -> int:
+    """
+    Redacts rows and writes them to a file, one line per row
+    Args:
+        rows: iterable of tuples in FIELDS order
+        file_path: path of the part file
+    Returns:
+        number of rows written
+    """
+    count = 0
+    with open(file_path, 'w') as f:
+        for line in redact_rows(rows, FIELDS):
+            f.write(line)
+            f.write('\n')
+            count += 1
+    return count
+
+
+def export_partition(index: int, low, high, output_dir: str,
+                     batch_size: int = BATCH_SIZE,
+                     ordered: bool = False) -> tuple:
+    """
+    Exports one key range, run in a worker process on a connection of
+    its own: a pooled connection of the parent must not cross fork()
+    Returns:
+        (index, part file path, number of rows) tuple
+    """
+    file_path = os.path.join(output_dir, f"part-{index:05d}.log")
+    db = connect_db()
+    try:
+        cursor = db.cursor(buffered=False)
+        cursor.execute(*range_query(low, high, ordered=ordered))
+        count = write_partition(stream_rows(cursor, batch_size), file_path)
+        cursor.close()
+    finally:
+        db.close()
+    return index, file_path, count
+
+
+def export_users(output: str, workers: int, partitions: int = None,
+                 ordered: bool = False, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Exports the redacted users table with a pool of worker processes
+    Args:
+        output: output file when ordered, output directory otherwise
+        workers: number of worker processes
+        partitions: number of key ranges, defaults to 4 per worker
+        ordered: merge the part files into `output` in key order
+        batch_size: rows fetched per round trip by each worker
+    Returns:
+        number of rows exported
+    """
+    db = get_db()
+    try:
+        ranges = partition_ranges(db, partitions or workers * 4)
+    finally:
+        db.close()
+
+    output_dir = output + '.parts' if ordered else output
+    os.makedirs(output_dir, exist_ok=True)
+
+    parts = {}
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(export_partition, i, low, high,
+                                   output_dir, batch_size, ordered)
+                   for i, (low, high) in enumerate(ranges)]
+        for future in as_completed(futures):
+            index, file_path, count = future.result()
+            parts[index] = file_path
+            total += count
+
+    if ordered:
+        with open(output, 'w') as out:
+            for index in sorted(parts):
+                with open(parts[index]) as part:
+                    shutil.copyfileobj(part, out)
+        shutil.rmtree(output_dir)
+    return total
+
+
+def main():
+    """
+    Parses the command line and runs the export
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('output',
+                        help="output directory, or file with --ordered")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument('--partitions', type=int, default=None,
+                        help="number of key ranges (default: 4 per worker)")
+    parser.add_argument('--ordered', action='store_true',
+                        help="write a single file in key order")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="rows fetched per round trip")
+    args = parser.parse_args()
+
+    total = export_users(args.output, args.workers, args.partitions,
+                         args.ordered, args.batch_size)
+    print(f"{total} rows exported")
+
+
+if __name__ == '__main__':
+    main()
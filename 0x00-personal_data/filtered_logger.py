@@ -3,15 +3,168 @@
 Module for filtering sensitive information from log messages
 """
 import re
+import atexit
+import copy
 import logging
+import logging.handlers
+import functools
+import json
 import mysql.connector
 import os
+import queue
+import threading
+import time
 
 
 # PII fields to be redacted
 # PII_FIELDS = ('email', 'phone', 'ssn', 'password', 'ip')
 PII_FIELDS = ('name', 'email', 'phone', 'ssn', 'password')
 
+# Number of compiled redaction engines kept around
+REDACTION_CACHE_SIZE = 128
+
+# What BoundedQueueHandler does with a record when its queue is full
+OVERFLOW_POLICIES = ('block', 'drop-oldest', 'drop-newest')
+
+# `extra=` of records whose message redact_rows() already redacted. The
+# marker is a private object: no other `extra=` key turns redaction off
+_REDACTED = object()
+REDACTED_EXTRA = {'_filtered_logger_redacted': _REDACTED}
+
+
+class RedactionEngine:
+    """ Redacts a fixed set of fields with a precompiled pattern
+    """
+
+    def __init__(self, fields: tuple, redaction: str, separator: str):
+        """
+        Compiles the redaction pattern once
+        Args:
+            fields: tuple of strings representing fields to obfuscate
+            redaction: string to replace sensitive info with
+            separator: string representing the character separating fields
+        """
+        self.fields = tuple(fields)
+        self.redaction = redaction
+        self.separator = separator
+        self._pattern = re.compile(
+            f'({"|".join(self.fields)})=[^{separator}]*')
+        self._replacement = f'\\1={redaction}'
+
+    def redact(self, message: str) -> str:
+        """
+        Returns the log message obfuscated
+        Args:
+            message: string representing the log line
+        Returns:
+            The obfuscated log message
+        """
+        return self._pattern.sub(self._replacement, message)
+
+
+class TokenizingRedactionEngine(RedactionEngine):
+    """ Redacts by splitting the message on the separator once
+
+    Produces the same output as RedactionEngine. Segments the split
+    cannot decide on its own, and configurations the split cannot
+    mirror (regex characters in fields, multi-character separators),
+    go through the compiled pattern.
+    """
+
+    def __init__(self, fields: tuple, redaction: str, separator: str):
+        """
+        Builds the field lookup table
+        Args:
+            fields: tuple of strings representing fields to obfuscate
+            redaction: string to replace sensitive info with
+            separator: string representing the character separating fields
+        """
+        super().__init__(fields, redaction, separator)
+        self._keys = frozenset(self.fields)
+        self._lengths = sorted({len(field) for field in self._keys},
+                               reverse=True)
+        self._tokenize = self._can_tokenize()
+
+    def _can_tokenize(self) -> bool:
+        """
+        Checks that splitting gives the same result as the pattern
+        Returns:
+            True if the single-pass path can be used, False otherwise
+        """
+        if len(self.separator) != 1 or self.separator in '\\]^-=':
+            return False
+        if '\\' in self.redaction:
+            return False
+        for field in self.fields:
+            if field == '' or re.escape(field) != field:
+                return False
+            if '=' in field or self.separator in field:
+                return False
+        return True
+
+    def _redacts_key(self, key: str) -> bool:
+        """
+        Checks if the pattern matches a field ending where `key` ends
+        Args:
+            key: text of a segment before its first `=`
+        Returns:
+            True if the segment value must be redacted, False otherwise
+        """
+        if key in self._keys:
+            return True
+        for length in self._lengths:
+            if length < len(key) and key[-length:] in self._keys:
+                return True
+        return False
+
+    def redact(self, message: str) -> str:
+        """
+        Returns the log message obfuscated
+        Args:
+            message: string representing the log line
+        Returns:
+            The obfuscated log message
+        """
+        if not self._tokenize:
+            return super().redact(message)
+        segments = message.split(self.separator)
+        for i, segment in enumerate(segments):
+            key, equals, value = segment.partition('=')
+            if not equals:
+                continue
+            if self._redacts_key(key):
+                segments[i] = f'{key}={self.redaction}'
+            elif '=' in value:
+                segments[i] = self._pattern.sub(self._replacement, segment)
+        return self.separator.join(segments)
+
+
+# Redaction engines selectable by RedactingFormatter
+REDACTION_MODES = {
+    'regex': RedactionEngine,
+    'tokenize': TokenizingRedactionEngine,
+}
+
+
+@functools.lru_cache(maxsize=REDACTION_CACHE_SIZE)
+def get_redaction_engine(fields: tuple, redaction: str, separator: str,
+                         mode: str = 'regex') -> RedactionEngine:
+    """
+    Returns a cached redaction engine for the given configuration
+    Args:
+        fields: tuple of strings representing fields to obfuscate
+        redaction: string to replace sensitive info with
+        separator: string representing the character separating fields
+        mode: key of REDACTION_MODES selecting the engine
+    Returns:
+        RedactionEngine: the compiled engine
+    Raises:
+        ValueError: if the mode is unknown
+    """
+    if mode not in REDACTION_MODES:
+        raise ValueError(f"Unknown redaction mode: {mode}")
+    return REDACTION_MODES[mode](fields, redaction, separator)
+
 
 def filter_datum(fields, redaction, message, separator):
     """
@@ -24,35 +177,168 @@ def filter_datum(fields, redaction, message, separator):
     Returns:
         The obfuscated log message
     """
-    pattern = f'({"|".join(fields)})=[^{separator}]*'
-    return re.sub(pattern, f'\\1={redaction}', message)
+    engine = get_redaction_engine(tuple(fields), redaction, separator)
+    return engine.redact(message)
+
 
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """ QueueHandler with a bounded queue and an overflow policy
 
-def get_logger() -> logging.Logger:
+    `dropped` counts the records discarded because the queue was full.
+    """
+
+    def __init__(self, queue_size: int = 10000, overflow: str = 'block'):
+        """
+        Args:
+            queue_size: maximum number of records waiting in the queue
+            overflow: one of OVERFLOW_POLICIES
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if queue_size < 1:
+            raise ValueError("Queue size must be at least 1")
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.overflow = overflow
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = None
+
+    def _count_drop(self):
+        """
+        Counts one dropped record; logging threads call it concurrently
+        """
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def enqueue(self, record: logging.LogRecord):
+        """
+        Puts a record in the queue, applying the overflow policy
+        """
+        if self.overflow == 'block':
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                if self.overflow == 'drop-newest':
+                    self._count_drop()
+                    return
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                continue
+            self._count_drop()
+
+
+class BlockingQueueListener(logging.handlers.QueueListener):
+    """ QueueListener that can be stopped while its queue is full,
+    and stopped more than once
+    """
+
+    def stop(self):
+        """
+        Flushes the queue and stops the listener thread if running
+        """
+        if self._thread is not None:
+            super().stop()
+
+    def enqueue_sentinel(self):
+        """
+        Waits for room in the queue to enqueue the stop sentinel
+        """
+        self.queue.put(self._sentinel)
+
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+def _build_handler(queued: bool, queue_size: int,
+                   overflow: str) -> logging.Handler:
+    """
+    Creates the redacting handler attached by get_logger
+    """
+    # Create stream handler
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(RedactingFormatter(PII_FIELDS))
+    if not queued:
+        return stream_handler
+
+    # Hand records over to a listener thread owning the stream handler
+    queue_handler = BoundedQueueHandler(queue_size, overflow)
+    queue_handler.listener = BlockingQueueListener(queue_handler.queue,
+                                                   stream_handler)
+    queue_handler.listener.start()
+    atexit.register(queue_handler.listener.stop)
+    return queue_handler
+
+
+def _close_handler(handler: logging.Handler):
+    """
+    Stops and closes a handler created by _build_handler
+    """
+    listener = getattr(handler, 'listener', None)
+    if listener is not None:
+        listener.stop()
+        atexit.unregister(listener.stop)
+        for target in listener.handlers:
+            target.close()
+    handler.close()
+
+
+def get_logger(queued: bool = False, queue_size: int = 10000,
+               overflow: str = 'block', name: str = "user_data",
+               reconfigure: bool = False) -> logging.Logger:
     """
     Returns a Logger object for handling
     Personal Identifiable Information (PII)
+
+    Loggers are configured once per name: calling get_logger again with
+    the same configuration returns the logger untouched, calling it with
+    a different configuration (or reconfigure=True) replaces the handler.
+    Args:
+        queued: redact and write records on a background thread
+        queue_size: maximum number of records waiting when queued
+        overflow: what to do when the queue is full, one of
+                  OVERFLOW_POLICIES
+        name: name of the logger
+        reconfigure: rebuild the handler even if the configuration
+                     did not change
     Returns:
         logging.Logger: Logger object
     """
+    config = (queued, queue_size, overflow)
     # Create logger
-    logger = logging.getLogger("user_data")
-    logger.setLevel(logging.INFO)
-    logger.propagate = False
+    logger = logging.getLogger(name)
+    with _loggers_lock:
+        cached = _loggers.get(name)
+        if cached is not None and cached[0] == config and not reconfigure:
+            return logger
 
-    # Create stream handler
-    stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(RedactingFormatter(PII_FIELDS))
+        # Build the new handler first: a rejected configuration leaves
+        # the current one in place
+        handler = _build_handler(queued, queue_size, overflow)
 
-    # Add handler to logger
-    logger.addHandler(stream_handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if cached is not None:
+            logger.removeHandler(cached[1])
+        # Add handler to logger
+        logger.addHandler(handler)
+        _loggers[name] = (config, handler)
+        if cached is not None:
+            _close_handler(cached[1])
 
     return logger
 
 
-def get_db() -> mysql.connector.connection.MySQLConnection:
+def connect_db(**options) -> mysql.connector.connection.MySQLConnection:
     """
-    Returns a connector to the MySQL database
+    Opens a new connection to the MySQL database
+    Args:
+        options: extra mysql.connector.connect arguments
     """
     username = os.getenv('PERSONAL_DATA_DB_USERNAME', 'root')
     password = os.getenv('PERSONAL_DATA_DB_PASSWORD', 'root')
@@ -63,10 +349,233 @@ def get_db() -> mysql.connector.connection.MySQLConnection:
         user=username,
         password=password,
         host=host,
-        database=db_name
+        database=db_name,
+        **options
     )
 
 
+class PooledConnection:
+    """ Connection borrowed from a ConnectionPool
+
+    Behaves like the wrapped connection, except that close() gives
+    it back to the pool instead of closing it. A borrowed connection
+    that is garbage collected without close() is given back too.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', connection):
+        """
+        Wraps a connection owned by `pool`
+        """
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name: str):
+        """
+        Delegates everything else to the wrapped connection
+        """
+        if self._connection is None:
+            raise AttributeError(f"Connection already released: {name}")
+        return getattr(self._connection, name)
+
+    def close(self):
+        """
+        Returns the connection to the pool
+        """
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+    def __del__(self):
+        """
+        Returns the connection to the pool if close() was not called
+        """
+        if self.__dict__.get('_connection') is not None:
+            self.close()
+
+    def __enter__(self):
+        """
+        Returns the borrowed connection
+        """
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Returns the connection to the pool
+        """
+        self.close()
+
+
+class ConnectionPool:
+    """ Bounded pool of database connections
+
+    metrics counts `hits` (idle connection reused), `waits` (pool
+    exhausted, caller had to wait), `creates` (new connection opened)
+    and `discards` (connection dropped by the health check or because
+    it could not be rolled back on release).
+
+    Released connections are rolled back, so the next borrower never
+    inherits an open transaction or its snapshot.
+
+    A pool belongs to the process that created it (`pid`): a forked
+    child must not reuse the parent's sockets and builds its own pool.
+    """
+
+    def __init__(self, connect=connect_db, size: int = 5,
+                 timeout: float = 30.0, health_check: bool = True):
+        """
+        Args:
+            connect: callable returning a new DB-API connection
+            size: maximum number of open connections
+            timeout: seconds to wait for a free connection
+            health_check: check idle connections with is_connected()
+                          before handing them out
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check = health_check
+        self.metrics = {'hits': 0, 'waits': 0, 'creates': 0, 'discards': 0}
+        self._idle = []
+        self._open = 0
+        self._condition = threading.Condition()
+        self.pid = os.getpid()
+
+    def _is_healthy(self, connection) -> bool:
+        """
+        Checks an idle connection before reusing it
+        """
+        is_connected = getattr(connection, 'is_connected', None)
+        if not self.health_check or is_connected is None:
+            return True
+        try:
+            return bool(is_connected())
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        """
+        Closes a connection and frees its slot
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+
+    def acquire(self) -> PooledConnection:
+        """
+        Borrows a connection, opening one if the pool is not full
+        Returns:
+            PooledConnection: connection to give back with close()
+        Raises:
+            TimeoutError: if no connection frees up within the timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._condition:
+                if not self._idle and self._open >= self.size:
+                    self.metrics['waits'] += 1
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("No database connection "
+                                           "available in the pool")
+                    self._condition.wait(remaining)
+                if self._idle:
+                    connection = self._idle.pop()
+                else:
+                    connection = None
+                    self._open += 1
+
+            if connection is None:
+                try:
+                    connection = self._connect()
+                except Exception:
+                    with self._condition:
+                        self._open -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self.metrics['creates'] += 1
+                return PooledConnection(self, connection)
+
+            if self._is_healthy(connection):
+                with self._condition:
+                    self.metrics['hits'] += 1
+                return PooledConnection(self, connection)
+            with self._condition:
+                self.metrics['discards'] += 1
+            self._discard(connection)
+
+    def release(self, connection):
+        """
+        Rolls back a connection and puts it back in the pool, or
+        discards it if the rollback fails
+        """
+        try:
+            connection.rollback()
+        except Exception:
+            with self._condition:
+                self.metrics['discards'] += 1
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def close_all(self):
+        """
+        Closes every idle connection
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._discard(connection)
+
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_db_pool() -> ConnectionPool:
+    """
+    Returns the process-wide connection pool, configured from
+    PERSONAL_DATA_DB_POOL_SIZE, PERSONAL_DATA_DB_POOL_TIMEOUT and
+    PERSONAL_DATA_DB_POOL_HEALTH_CHECK
+
+    A pool inherited through fork() is left alone, its connections
+    belong to the parent, and a new pool is built for this process.
+    """
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is None or _db_pool.pid != os.getpid():
+            health_check = os.getenv('PERSONAL_DATA_DB_POOL_HEALTH_CHECK',
+                                     '1')
+            _db_pool = ConnectionPool(
+                size=int(os.getenv('PERSONAL_DATA_DB_POOL_SIZE', 5)),
+                timeout=float(os.getenv('PERSONAL_DATA_DB_POOL_TIMEOUT',
+                                        30)),
+                health_check=health_check.lower() not in ('0', 'false')
+            )
+        return _db_pool
+
+
+def get_db() -> mysql.connector.connection.MySQLConnection:
+    """
+    Returns a connector to the MySQL database
+
+    When PERSONAL_DATA_DB_POOL_SIZE is set, the connection is borrowed
+    from get_db_pool() and close() gives it back to the pool.
+    """
+    if os.getenv('PERSONAL_DATA_DB_POOL_SIZE'):
+        return get_db_pool().acquire()
+    return connect_db()
+
+
 class RedactingFormatter(logging.Formatter):
     """ Redacting Formatter class
     """
@@ -75,53 +584,236 @@ class RedactingFormatter(logging.Formatter):
     FORMAT = "[HOLBERTON] %(name)s %(levelname)s %(asctime)-15s: %(message)s"
     SEPARATOR = ";"
 
-    def __init__(self, fields: tuple):
+    def __init__(self, fields: tuple, mode: str = 'regex'):
         """Initializing the variables.
 
         Args:
             fields
+            mode: redaction engine to use, 'regex' or 'tokenize'
 
         Returns:
             None.
         """
         super(RedactingFormatter, self).__init__(self.FORMAT)
         self.fields = fields
+        self.mode = mode
+        self._engine = get_redaction_engine(tuple(fields), self.REDACTION,
+                                            self.SEPARATOR, mode)
+
+    def redact_message(self, record: logging.LogRecord) -> str:
+        """Return the redacted message of a record.
+
+        The result is cached on the record per redaction engine, so a
+        record fanned out to several handlers is redacted only once.
+        Records logged with extra=REDACTED_EXTRA are already redacted.
+
+        Args:
+            record (logging.LogRecord): The log record to redact.
+
+        Returns:
+            str: The record message with sensitive data redacted.
+        """
+        cache = record.__dict__.get('_redacted_messages')
+        if cache is None:
+            cache = record._redacted_messages = {}
+        message = cache.get(self._engine)
+        if message is None:
+            message = record.getMessage()
+            if not is_redacted(record):
+                message = self._engine.redact(message)
+            cache[self._engine] = message
+        return message
 
     def format(self, record: logging.LogRecord) -> str:
         """Format the specified log record, redacting sensitive information.
 
+        Redaction only happens here, when a handler emits the record, and
+        works on a copy: msg and args of the original record are kept.
+
         Args:
             record (logging.LogRecord): The log record to format.
 
         Returns:
             str: The formatted log message with sensitive data redacted.
         """
-        record.msg = filter_datum(self.fields, self.REDACTION,
-                                  record.getMessage(), self.SEPARATOR)
-        return super().format(record)
+        redacted = copy.copy(record)
+        redacted.msg = self.redact_message(record)
+        redacted.args = None
+        return super().format(redacted)
+
+
+# LogRecord attributes that are not `extra=` fields
+RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord('', 0, '', 0, '', (), None))
+) | {'message', 'asctime', '_redacted_messages'} | set(REDACTED_EXTRA)
+
+
+def is_redacted(record: logging.LogRecord) -> bool:
+    """
+    Checks if a record was logged with extra=REDACTED_EXTRA
+    """
+    return record.__dict__.get('_filtered_logger_redacted') is _REDACTED
+
+
+class StructuredRedactingFormatter(logging.Formatter):
+    """ Structured Redacting Formatter class
+
+    Emits one compact JSON object per record. Dict messages and
+    `extra=` fields are merged into the object with PII keys masked at
+    any depth, string messages go through the tokenizing redaction engine. The
+    logger name, level and time are written under `logger`, `level`
+    and `time` so they do not clash with the `name` PII field.
+    """
+
+    REDACTION = RedactingFormatter.REDACTION
+    SEPARATOR = RedactingFormatter.SEPARATOR
+
+    # Reused encoder: json.dumps builds a new one for non-default options
+    _encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False,
+                                check_circular=False, default=str)
+
+    def __init__(self, fields: tuple):
+        """Initializing the variables.
+
+        Args:
+            fields: keys whose values are masked
+
+        Returns:
+            None.
+        """
+        super(StructuredRedactingFormatter, self).__init__()
+        self.fields = frozenset(fields)
+        self._engine = get_redaction_engine(tuple(fields), self.REDACTION,
+                                            self.SEPARATOR, 'tokenize')
+
+    def mask(self, payload: dict) -> dict:
+        """Return a copy of `payload` with the values of PII keys masked,
+        at any depth of nested dicts, lists and tuples.
+
+        Args:
+            payload (dict): The fields to log.
+
+        Returns:
+            dict: The masked fields.
+        """
+        fields = self.fields
+        redaction = self.REDACTION
+        mask_value = self._mask_value
+        return {key: redaction if key in fields else mask_value(value)
+                for key, value in payload.items()}
+
+    def _mask_value(self, value):
+        """Return `value` with the PII keys of nested dicts masked.
+
+        Args:
+            value: A field value; dicts, lists and tuples are copied.
+
+        Returns:
+            The masked value, or `value` itself if nothing can nest.
+        """
+        if isinstance(value, dict):
+            return self.mask(value)
+        if isinstance(value, (list, tuple)):
+            return [self._mask_value(item) for item in value]
+        return value
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format the specified log record as a JSON line.
+
+        Args:
+            record (logging.LogRecord): The log record to format.
+
+        Returns:
+            str: The JSON object with sensitive data masked.
+        """
+        entry = self.mask({key: value
+                           for key, value in record.__dict__.items()
+                           if key not in RECORD_ATTRIBUTES})
+        if isinstance(record.msg, dict):
+            entry.update(self.mask(record.msg))
+        elif is_redacted(record):
+            entry['message'] = record.getMessage()
+        else:
+            entry['message'] = self._engine.redact(record.getMessage())
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        entry['logger'] = record.name
+        entry['level'] = record.levelname
+        entry['time'] = self.formatTime(record)
+        return self._encoder.encode(entry)
+
+
+def redact_rows(rows, fields: list, pii_fields: tuple = PII_FIELDS):
+    """
+    Yields one redacted log line per database row
+    Args:
+        rows: iterable of tuples, e.g. a cursor
+        fields: column names, in the order of the row values
+        pii_fields: column names whose values are redacted
+    Returns:
+        generator of `field=value; ...` lines with PII columns redacted
+        by position, ready to be logged with extra=REDACTED_EXTRA
+    """
+    pii = frozenset(pii_fields)
+    parts = []
+    positions = []
+    for i, field in enumerate(fields):
+        name = field.replace('{', '{{').replace('}', '}}')
+        if field in pii:
+            parts.append(f"{name}={RedactingFormatter.REDACTION}")
+        else:
+            parts.append(f"{name}={{}}")
+            positions.append(i)
+    template = '; '.join(parts)
+
+    for row in rows:
+        yield template.format(*[row[i] for i in positions])
+
+
+def stream_rows(cursor, batch_size: int):
+    """
+    Yields the rows of an executed query, `batch_size` rows at a time
+    Args:
+        cursor: cursor on which a query has been executed
+        batch_size: number of rows fetched per round trip
+    Returns:
+        generator of rows
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
 
 
 def main():
     """
     Main function to retrieve and display filtered user data
+
+    When PERSONAL_DATA_DB_BATCH_SIZE is set, rows are streamed from an
+    unbuffered cursor in batches of that size instead of being loaded
+    into memory all at once.
     """
+    try:
+        batch_size = int(os.getenv('PERSONAL_DATA_DB_BATCH_SIZE', 0))
+    except ValueError:
+        batch_size = 0
+
     db = get_db()
-    cursor = db.cursor()
+    if batch_size > 0:
+        cursor = db.cursor(buffered=False)
+    else:
+        cursor = db.cursor()
     cursor.execute("SELECT * FROM users;")
+    rows = stream_rows(cursor, batch_size) if batch_size > 0 else cursor
 
     logger = get_logger()
 
     fields = ['name', 'email', 'phone', 'ssn', 'password', 'ip',
               'last_login', 'user_agent']
 
-    for row in cursor:
-        message_parts = []
-        for i in range(len(fields)):
-            field = fields[i]
-            value = row[i]
-            message_parts.append(f"{field}={value}")
-        message = '; '.join(message_parts)
-        logger.info(message)
+    for line in redact_rows(rows, fields):
+        logger.info(line, extra=REDACTED_EXTRA)
 
     cursor.close()
     db.close()
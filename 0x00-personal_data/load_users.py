@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Bulk loader of a user_data.csv shaped file into the users table
+
+Rows are streamed from the CSV file and inserted with executemany in
+batches, committing every --commit-every rows, or handed over to the
+server in one LOAD DATA LOCAL INFILE statement with --local-infile.
+
+Usage: ./load_users.py CSV_FILE [--batch-size N] [--commit-every N]
+                                [--local-infile]
+"""
+import argparse
+import csv
+import sys
+import time
+connect_db = __import__('filtered_logger').connect_db
+
+
+COLUMNS = ('name', 'email', 'phone', 'ssn', 'password', 'ip',
+           'last_login', 'user_agent')
+BATCH_SIZE = 1000
+COMMIT_EVERY = 10000
+
+# DB-API paramstyle -> placeholder
+PLACEHOLDERS = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+
+
+def read_batches(f, batch_size: int):
+    """
+    Yields lists of at most `batch_size` rows from a CSV file
+    Args:
+        f: open CSV file, starting with a header row naming COLUMNS
+        batch_size: number of rows per list
+    Raises:
+        ValueError: if the header does not match COLUMNS
+    """
+    reader = csv.reader(f)
+    header = tuple(next(reader, ()))
+    if header != COLUMNS:
+        raise ValueError(f"Unexpected CSV header: {header}")
+    batch = []
+    for row in reader:
+        batch.append(tuple(row))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def print_progress(rows: int, elapsed: float):
+    """
+    Reports the number of rows loaded so far on stderr
+    """
+    rate = rows / elapsed if elapsed else 0
+    print(f"{rows} rows loaded in {elapsed:.1f}s ({rate:,.0f} rows/sec)",
+          file=sys.stderr)
+
+
+def load_csv(db, file_path: str, batch_size: int = BATCH_SIZE,
+             commit_every: int = COMMIT_EVERY, paramstyle: str = 'format',
+             progress=print_progress) -> int:
+    """
+    Inserts the rows of a CSV file into the users table
+    Args:
+        db: DB-API connection, e.g. get_db() or sqlite3.connect()
+        file_path: path of the CSV file
+        batch_size: rows per executemany call
+        commit_every: rows per transaction
+        paramstyle: paramstyle of the DB-API module of `db`
+        progress: callable(rows, elapsed) called after each commit,
+                  or None
+    Returns:
+        number of rows inserted
+    """
+    placeholder = PLACEHOLDERS[paramstyle]
+    query = "INSERT INTO users({}) VALUES ({})".format(
+        ', '.join(COLUMNS), ', '.join([placeholder] * len(COLUMNS)))
+
+    start = time.perf_counter()
+    total = 0
+    pending = 0
+    cursor = db.cursor()
+    try:
+        with open(file_path, newline='') as f:
+            for batch in read_batches(f, batch_size):
+                cursor.executemany(query, batch)
+                total += len(batch)
+                pending += len(batch)
+                if pending >= commit_every:
+                    db.commit()
+                    pending = 0
+                    if progress is not None:
+                        progress(total, time.perf_counter() - start)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    # Report the rows committed since the last report, if any
+    if progress is not None and pending:
+        progress(total, time.perf_counter() - start)
+    return total
+
+
+def load_data_infile(db, file_path: str, progress=print_progress) -> int:
+    """
+    Loads a CSV file with LOAD DATA LOCAL INFILE (MySQL only)
+    Args:
+        db: connection opened with allow_local_infile=True
+        file_path: path of the CSV file
+        progress: callable(rows, elapsed) called once done, or None
+    Returns:
+        number of rows inserted
+    """
+    query = ("LOAD DATA LOCAL INFILE %s INTO TABLE users "
+             "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+             "LINES TERMINATED BY '\\n' IGNORE 1 LINES ({})").format(
+                 ', '.join(COLUMNS))
+    start = time.perf_counter()
+    cursor = db.cursor()
+    try:
+        cursor.execute(query, (file_path,))
+        total = cursor.rowcount
+        db.commit()
+    finally:
+        cursor.close()
+    if progress is not None:
+        progress(total, time.perf_counter() - start)
+    return total
+
+
+def main():
+    """
+    Parses the command line and loads the file
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('csv_file', help="CSV file with a header row")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="rows per executemany call")
+    parser.add_argument('--commit-every', type=int, default=COMMIT_EVERY,
+                        help="rows per transaction")
+    parser.add_argument('--local-infile', action='store_true',
+                        help="use LOAD DATA LOCAL INFILE")
+    args = parser.parse_args()
+
+    if args.local_infile:
+        db = connect_db(allow_local_infile=True)
+    else:
+        db = connect_db()
+    try:
+        if args.local_infile:
+            load_data_infile(db, args.csv_file)
+        else:
+            load_csv(db, args.csv_file, args.batch_size, args.commit_every)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,8 @@ CREATE TABLE users (
         password VARCHAR(256),
     ip VARCHAR(64), 
         last_login TIMESTAMP,
-    user_agent VARCHAR(512)
+    user_agent VARCHAR(512),
+    INDEX users_email (email)
 );
 
 INSERT INTO users(name, email, phone, ssn, password, ip, last_login, user_agent) VALUES ("Marlene Wood","hwestiii@att.net","(473) 401-4253","261-72-6780","K5?BMNv","60ed:c396:2ff:244:bbd0:9208:26f2:93ea","2019-11-14 06:14:24","Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/74.0.3729.157 Safari/537.36");
@@ -3,15 +3,89 @@
 """
 from api.v1.auth.auth import Auth
 from models.user import User
+from collections import OrderedDict
+from os import getenv
 import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
 from typing import TypeVar
 
 
 class BasicAuth(Auth):
     """
     Class to manage basic authentication
+
+    Verified credentials are cached, keyed by a keyed digest of the
+    Authorization header, so a client replaying the same header skips
+    the decoding, the user search and the password hashing. An entry
+    is dropped after BASIC_AUTH_CACHE_TTL seconds, when the cache grows
+    past BASIC_AUTH_CACHE_SIZE entries (least recently used first), or
+    as soon as the user is removed or saved with another email or
+    password. BASIC_AUTH_CACHE_SIZE=0 disables the cache.
     """
 
+    def __init__(self):
+        """
+        Initializes an empty credentials cache
+        """
+        try:
+            self.cache_size = int(getenv("BASIC_AUTH_CACHE_SIZE", 1024))
+            self.cache_ttl = float(getenv("BASIC_AUTH_CACHE_TTL", 60))
+        except ValueError:
+            self.cache_size = 1024
+            self.cache_ttl = 60
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = OrderedDict()
+        self._cache_key = os.urandom(32)
+        self._cache_lock = threading.Lock()
+
+    def _header_digest(self, authorization_header: str) -> bytes:
+        """
+        Returns the cache key of an Authorization header
+        """
+        return hmac.new(self._cache_key, authorization_header.encode(),
+                        hashlib.sha256).digest()
+
+    def _cached_user(self, digest: bytes) -> TypeVar('User'):
+        """
+        Returns the User cached for a header digest, or None
+        """
+        with self._cache_lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                expires, user_id, email, password = entry
+                user = User.get(user_id)
+                if expires > time.monotonic() and user is not None and \
+                        user.email == email and user.password == password:
+                    self._cache.move_to_end(digest)
+                    self.cache_hits += 1
+                    return user
+                del self._cache[digest]
+            self.cache_misses += 1
+            return None
+
+    def _cache_user(self, digest: bytes, user: TypeVar('User')):
+        """
+        Caches the User verified for a header digest
+        """
+        with self._cache_lock:
+            self._cache[digest] = (time.monotonic() + self.cache_ttl,
+                                   user.id, user.email, user.password)
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def cache_hit_rate(self) -> float:
+        """
+        Returns the fraction of lookups answered from the cache
+        """
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
     def extract_base64_authorization_header(
             self, authorization_header: str) -> str:
         """
@@ -115,6 +189,12 @@ class BasicAuth(Auth):
         auth_header = self.authorization_header(request)
         if auth_header is None:
             return None
+        digest = None
+        if self.cache_size > 0:
+            digest = self._header_digest(auth_header)
+            user = self._cached_user(digest)
+            if user is not None:
+                return user
         base64_header = self.extract_base64_authorization_header(auth_header)
         if base64_header is None:
             return None
@@ -124,4 +204,7 @@ class BasicAuth(Auth):
         email, password = self.extract_user_credentials(decoded_header)
         if email is None or password is None:
             return None
-        return self.user_object_from_credentials(email, password)
+        user = self.user_object_from_credentials(email, password)
+        if user is not None and digest is not None:
+            self._cache_user(digest, user)
+        return user
@@ -2,18 +2,126 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request
 from models.user import User
+from os import getenv
+from typing import Iterable, Iterator
+import json
+
+STREAM_CHUNK_SIZE = 1000
+MAX_PAGE_SIZE = int(getenv("USERS_MAX_PAGE_SIZE", 1000))
+# Attributes clients may filter, order and project on
+QUERY_ATTRIBUTES = ('id', 'email', 'first_name', 'last_name',
+                    'created_at', 'updated_at')
+# Query parameters that are not filters
+QUERY_OPTIONS = ('order_by', 'fields')
+
+
+def is_query_parameter(key: str) -> bool:
+    """ Check if a query parameter asks for a query: a filter on one of
+    QUERY_ATTRIBUTES or one of QUERY_OPTIONS
+    """
+    return key in QUERY_OPTIONS or \
+        key.partition('__')[0] in QUERY_ATTRIBUTES
+
+
+def stream_json_array(objs: Iterable) -> Iterator[str]:
+    """ Yield the JSON array of objects, STREAM_CHUNK_SIZE at a time
+    """
+    yield '['
+    chunk = []
+    separator = ''
+    for obj in objs:
+        chunk.append(obj.to_json_string())
+        if len(chunk) == STREAM_CHUNK_SIZE:
+            yield separator + ', '.join(chunk)
+            chunk = []
+            separator = ', '
+    if chunk:
+        yield separator + ', '.join(chunk)
+    yield ']\n'
+
+
+def parse_user_query(args: dict) -> dict:
+    """ Turn query parameters into User.query() keyword arguments:
+      - <attribute>=value or <attribute>__<operator>=value, operators
+        being those of Base.query(), with comma-separated values for in
+      - order_by=<attribute> or order_by=-<attribute>
+      - fields=<attribute>,...
+    Other parameters, such as cache busters, are ignored. Raise
+    ValueError if order_by or fields name an attribute outside
+    QUERY_ATTRIBUTES
+    """
+    filters = {}
+    for key, value in args.items():
+        if key in QUERY_OPTIONS or not is_query_parameter(key):
+            continue
+        attribute, _, op = key.partition('__')
+        op = op or 'eq'
+        filters.setdefault(attribute, {})[op] = \
+            value.split(',') if op == 'in' else value
+    query = {'filters': filters}
+    if args.get('order_by'):
+        if args['order_by'].lstrip('-') not in QUERY_ATTRIBUTES:
+            raise ValueError("Unknown attribute: {}".format(
+                args['order_by'].lstrip('-')))
+        query['order_by'] = args['order_by']
+    if args.get('fields'):
+        fields = args['fields'].split(',')
+        for field in fields:
+            if field not in QUERY_ATTRIBUTES:
+                raise ValueError("Unknown attribute: {}".format(field))
+        query['fields'] = fields
+    return query
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (optional):
+      - limit: page size, at most USERS_MAX_PAGE_SIZE (default 1000)
+      - cursor: next_cursor of the previous page
+      - filters, order_by and fields (see parse_user_query), not
+        combined with cursor; other parameters are ignored
     Return:
-      - list of all User objects JSON represented
+      - without any parameter: list of all User objects JSON
+        represented, streamed in page order (sorted by id, no longer
+        by creation)
+      - with filters, order_by or fields: list of the matching User
+        objects JSON represented, or projected on fields, up to limit
+      - otherwise: {"data": one page of User objects JSON represented,
+        "next_cursor": cursor of the next page or null after the last}
+      - 400 if limit is not a positive integer or the query is invalid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    querying = any(map(is_query_parameter, request.args))
+    if limit is None and cursor is None and not querying:
+        return Response(stream_json_array(User.all(lazy=True)),
+                        mimetype='application/json')
+    try:
+        limit = MAX_PAGE_SIZE if limit is None else int(limit)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return jsonify({'error': "limit must be a positive integer"}), 400
+    if querying:
+        if cursor is not None:
+            return jsonify({'error': "cursor can't be used in a query"}), 400
+        try:
+            query = parse_user_query(request.args)
+            users = User.query(limit=min(limit, MAX_PAGE_SIZE), **query)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if 'fields' in query:
+            return jsonify(users)
+        return Response(stream_json_array(users),
+                        mimetype='application/json')
+    users, next_cursor = User.page(min(limit, MAX_PAGE_SIZE), cursor)
+    body = '{{"data": [{}], "next_cursor": {}}}\n'.format(
+        ', '.join(user.to_json_string() for user in users),
+        json.dumps(next_cursor))
+    return Response(body, mimetype='application/json')
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+""" Replays a request log against BasicAuth.current_user, with and
+without the credentials cache
+
+Usage: ./benchmark_basic_auth.py [USERS] [REQUESTS]
+"""
+import base64
+import os
+import random
+import sys
+import time
+from models.base import DATA
+from models.user import User
+
+
+class Request:
+    """ Minimal stand-in for flask.request
+    """
+
+    def __init__(self, authorization: str):
+        """ Keeps the Authorization header
+        """
+        self.headers = {'Authorization': authorization}
+
+
+def request_log(users: int, requests: int, seed: int = 0) -> list:
+    """ Creates `users` in-memory users and a skewed log of requests
+    """
+    DATA['User'] = {}
+    headers = []
+    for i in range(users):
+        user = User(email=f"user{i}@hbtn.io")
+        user.password = f"pwd{i}"
+        DATA['User'][user.id] = user
+        credentials = f"user{i}@hbtn.io:pwd{i}".encode()
+        headers.append("Basic " + base64.b64encode(credentials).decode())
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(users)]
+    return [Request(header)
+            for header in rng.choices(headers, weights, k=requests)]
+
+
+def replay(log: list, cache_size: int):
+    """ Replays the log and prints hit rate and latency
+    """
+    os.environ['BASIC_AUTH_CACHE_SIZE'] = str(cache_size)
+    from api.v1.auth.basic_auth import BasicAuth
+    auth = BasicAuth()
+    start = time.perf_counter()
+    for request in log:
+        assert auth.current_user(request) is not None
+    elapsed = time.perf_counter() - start
+    print("cache size {:>6}: hit rate {:>6.1%}, {:>8.2f} us/request".format(
+        cache_size, auth.cache_hit_rate(), elapsed / len(log) * 1e6))
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    log = request_log(users, requests)
+    replay(log, 0)
+    replay(log, users // 4)
+    replay(log, users)
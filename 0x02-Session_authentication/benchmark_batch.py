@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+""" Objects/sec of single versus batched User.save() calls
+
+Usage: ./benchmark_batch.py [OBJECTS]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from models.base import Base
+from models.user import User
+
+
+def create_users(count: int) -> float:
+    """ Creates and saves `count` users, returns objects/sec
+    """
+    User.load_from_file()
+    start = time.perf_counter()
+    for i in range(count):
+        user = User(email=f"user{i}@hbtn.io")
+        user.password = f"pwd{i}"
+        user.save()
+    return count / (time.perf_counter() - start)
+
+
+def batched(count: int) -> float:
+    """ Same as create_users, inside Base.batch()
+    """
+    start = time.perf_counter()
+    with Base.batch():
+        create_users(count)
+    return count / (time.perf_counter() - start)
+
+
+def check_reload():
+    """ Deferred writes survive a load_from_file() before their flush,
+    from the same thread and from another one
+    """
+    Base.start_group_commit(0.1)
+    try:
+        User.load_from_file()
+        User(email="grouped@hbtn.io").save()
+        User.load_from_file()
+        assert User.search({'email': "grouped@hbtn.io"})
+    finally:
+        Base.stop_group_commit()
+    with Base.batch():
+        User(email="batched@hbtn.io").save()
+        User.load_from_file()
+        assert User.search({'email': "batched@hbtn.io"})
+        reload = threading.Thread(target=User.load_from_file)
+        User(email="other@hbtn.io").save()
+        reload.start()
+        reload.join()
+    User.load_from_file()
+    assert User.count() == 3
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for storage in ('json', 'journal'):
+        User.storage = storage
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            check_reload()
+        for name, run in (('single', create_users), ('batched', batched)):
+            with tempfile.TemporaryDirectory() as tmp:
+                os.chdir(tmp)
+                rate = run(count)
+                User.load_from_file()
+                assert User.count() == count
+            print("{:<8} {:<8} {:>12,.0f} objects/sec".format(
+                storage, name, rate))
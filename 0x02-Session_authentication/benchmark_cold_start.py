@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+""" Cold-start User.load_from_file() time, JSON versus SQLite storage
+
+Usage: ./benchmark_cold_start.py [USERS]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from models.base import DATA
+from models.user import User
+
+
+def write_store(storage: str, size: int):
+    """ Writes `size` users in the format of `storage`
+    """
+    User.storage = storage
+    if storage == 'sqlite':
+        rows = ((f"{i:08d}", 1704067200, 1704067200,
+                 '{"_password": null, "first_name": null, "last_name": null}',
+                 f"user{i}@hbtn.io") for i in range(size))
+        User.sqlite_store().replace_all(rows)
+        return
+    objs_json = {}
+    for i in range(size):
+        obj_id = f"{i:08d}"
+        objs_json[obj_id] = {
+            'id': obj_id,
+            'email': f"user{i}@hbtn.io",
+            '_password': None,
+            'first_name': None,
+            'last_name': None,
+            'created_at': "2024-01-01T00:00:00",
+            'updated_at': "2024-01-01T00:00:00",
+        }
+    with open(User.file_path(), 'w') as f:
+        json.dump(objs_json, f)
+
+
+def cold_start(storage: str, size: int):
+    """ Prints the load time and the first lookup time of a store
+    """
+    write_store(storage, size)
+    DATA.clear()
+    start = time.perf_counter()
+    User.load_from_file()
+    loaded = time.perf_counter() - start
+    email = f"user{size // 2}@hbtn.io"
+    start = time.perf_counter()
+    user = User.search({'email': email})[0]
+    assert User.get(user.id).email == email
+    assert user.created_at.isoformat() == "2024-01-01T00:00:00"
+    lookup = time.perf_counter() - start
+    print("{:<7} {:>9,} users: load {:>8.2f} s, first lookup {:>8.3f} ms"
+          .format(storage, size, loaded, lookup * 1000))
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for storage in ('json', 'sqlite'):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            cold_start(storage, size)
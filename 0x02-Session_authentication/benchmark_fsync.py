@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+""" User.save() latency under each MODEL_FSYNC policy
+
+Usage: ./benchmark_fsync.py [SAVES] [EXISTING_USERS]
+"""
+import os
+import sys
+import tempfile
+import time
+from models.base import Base
+from models.user import User
+
+
+def save_latencies(saves: int, existing: int) -> list:
+    """ Returns the sorted latencies, in milliseconds, of `saves` saves
+    on top of `existing` users
+    """
+    User.load_from_file()
+    with Base.batch():
+        for i in range(existing):
+            User(email=f"user{i}@hbtn.io").save()
+    latencies = []
+    for i in range(saves):
+        user = User(email=f"new{i}@hbtn.io")
+        start = time.perf_counter()
+        user.save()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+if __name__ == "__main__":
+    saves = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    existing = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    for storage in ('json', 'journal'):
+        User.storage = storage
+        for policy in ('never', 'periodic', 'always'):
+            os.environ['MODEL_FSYNC'] = policy
+            with tempfile.TemporaryDirectory() as tmp:
+                os.chdir(tmp)
+                latencies = save_latencies(saves, existing)
+            print("{:<8} {:<9} p50 {:>8.3f} ms  p99 {:>8.3f} ms".format(
+                storage, policy, latencies[len(latencies) // 2],
+                latencies[int(len(latencies) * 0.99)]))
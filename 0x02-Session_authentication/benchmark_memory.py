@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+""" Resident memory of User and UserSession objects held in DATA
+
+Usage: ./benchmark_memory.py [OBJECTS]
+"""
+import gc
+import os
+import sys
+from models.base import DATA
+from models.user import User
+from models.user_session import UserSession
+
+
+def resident_memory() -> int:
+    """ Returns the resident set size of the process, in bytes
+    """
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def measure(build, count: int) -> float:
+    """ Returns the resident memory, in MiB per 100k objects, of `count`
+    objects built by `build(i)` and kept in DATA
+    """
+    gc.collect()
+    before = resident_memory()
+    for i in range(count):
+        obj = build(i)
+        DATA[obj.__class__.__name__][obj.id] = obj
+    gc.collect()
+    return (resident_memory() - before) / count * 100000 / (1 << 20)
+
+
+def user(i: int) -> User:
+    """ A user as created through the API
+    """
+    return User(email=f"user{i}@hbtn.io", _password="{:064x}".format(i),
+                first_name=f"First{i}", last_name=f"Last{i}")
+
+
+def session(i: int) -> UserSession:
+    """ A session of one of the users
+    """
+    return UserSession(user_id="{:036x}".format(i),
+                       session_id="{:036x}".format(i + 1))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    DATA['User'] = {}
+    DATA['UserSession'] = {}
+    print("User        {:>8.1f} MiB per 100k".format(measure(user, count)))
+    print("UserSession {:>8.1f} MiB per 100k".format(
+        measure(session, count)))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+""" Per-request cost of GET /api/v1/users pages versus the whole list
+
+Usage: ./benchmark_pagination.py [USERS] [LIMIT]
+"""
+import os
+import sys
+import tempfile
+import time
+
+
+def timed(function) -> float:
+    """ Returns the milliseconds of one call
+    """
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(size: int, limit: int):
+    """ Pages through `size` in-memory users `limit` at a time
+    """
+    os.environ.pop('AUTH_TYPE', None)
+    from api.v1.app import app
+    from models.base import DATA
+    from models.user import User
+    DATA['User'] = {}
+    for i in range(size):
+        user = User(email=f"user{i}@hbtn.io")
+        DATA['User'][user.id] = user
+    client = app.test_client()
+    print("whole list        {:>10.2f} ms".format(
+        timed(lambda: client.get('/api/v1/users').get_data())))
+    for user in DATA['User'].values():
+        user._json_cache = None
+    print("first page        {:>10.2f} ms".format(
+        timed(lambda: client.get(f'/api/v1/users?limit={limit}'))))
+    cursors = [None]
+    latencies = []
+    while True:
+        query = f'/api/v1/users?limit={limit}'
+        if cursors[-1] is not None:
+            query += f'&cursor={cursors[-1]}'
+        start = time.perf_counter()
+        response = client.get(query).get_json()
+        latencies.append((time.perf_counter() - start) * 1000)
+        cursors.append(response['next_cursor'])
+        if cursors[-1] is None:
+            break
+    assert len(cursors) - 1 == -(-size // limit)
+    latencies.sort()
+    print("{:>6} pages       p50 {:>6.2f} ms, p99 {:>6.2f} ms".format(
+        len(latencies), latencies[len(latencies) // 2],
+        latencies[int(len(latencies) * 0.99)]))
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        run(size, limit)
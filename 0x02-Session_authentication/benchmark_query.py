@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+""" User.query() versus filtering User.all() client-side
+
+Usage: ./benchmark_query.py [USERS]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from models.base import Base
+from models.user import User
+
+START = datetime(2024, 1, 1)
+
+
+def populate(size: int):
+    """ Saves `size` users, created one per second from START
+    """
+    User.storage = 'sqlite'
+    User.load_from_file()
+    with Base.batch():
+        for i in range(size):
+            User(email=f"user{i}@hbtn.io",
+                 created_at=START + timedelta(seconds=i)).save()
+
+
+def timed(function) -> tuple:
+    """ Returns the result and the milliseconds of one call
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def compare(name: str, query: dict, scan):
+    """ Prints the latency of a query and of the equivalent scan, after
+    checking they agree
+    """
+    User.query(**query)
+    result, query_ms = timed(lambda: User.query(**query))
+    expected, scan_ms = timed(lambda: scan(User.all()))
+    assert [user.id for user in result] == [user.id for user in expected]
+    print("{:<28} query {:>9.3f} ms, scan {:>9.3f} ms".format(
+        name, query_ms, scan_ms))
+
+
+def run(size: int):
+    """ Compares the queries on `size` users
+    """
+    populate(size)
+    low, high = START + timedelta(seconds=size // 2), \
+        START + timedelta(seconds=size // 2 + 100)
+    emails = [f"user{i}@hbtn.io" for i in range(0, size, size // 10)]
+    compare("email prefix", {'filters': {'email': {'prefix': 'user1234'}},
+                             'order_by': 'email'},
+            lambda users: sorted((user for user in users
+                                  if user.email.startswith('user1234')),
+                                 key=lambda user: user.email))
+    compare("created_at range", {'filters': {'created_at': {
+        'gte': low, 'lt': high}}, 'order_by': 'created_at'},
+        lambda users: sorted((user for user in users
+                              if low <= user.created_at < high),
+                             key=lambda user: user.created_at))
+    compare("email in", {'filters': {'email': {'in': emails}},
+                         'order_by': 'email'},
+            lambda users: sorted((user for user in users
+                                  if user.email in emails),
+                                 key=lambda user: user.email))
+    compare("newest 10", {'order_by': '-created_at', 'limit': 10},
+            lambda users: sorted(users, key=lambda user: user.created_at,
+                                 reverse=True)[:10])
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        run(size)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+""" Compares User.search by email through the index with a full scan
+
+Usage: ./benchmark_search.py [SIZE ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from models.base import DATA
+from models.user import User
+
+
+def populate(size: int):
+    """ Writes `size` users to .db_User.json and loads them
+    """
+    objs_json = {}
+    for i in range(size):
+        obj_id = f"{i:08d}"
+        objs_json[obj_id] = {
+            'id': obj_id,
+            'email': f"user{i}@hbtn.io",
+            '_password': None,
+            'first_name': None,
+            'last_name': None,
+            'created_at': "2024-01-01T00:00:00",
+            'updated_at': "2024-01-01T00:00:00",
+        }
+    with open(".db_User.json", 'w') as f:
+        json.dump(objs_json, f)
+    User.load_from_file()
+
+
+def timed(function, repeat: int) -> float:
+    """ Returns the average microseconds of one call
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(size: int):
+    """ Prints the search latencies for a store of `size` users
+    """
+    populate(size)
+    email = f"user{size // 2}@hbtn.io"
+
+    def scan():
+        return [user for user in DATA['User'].values()
+                if user.email == email]
+
+    assert User.search({'email': email}) == scan()
+    repeat = max(1, 100000 // size)
+    indexed = timed(lambda: User.search({'email': email}), repeat * 100)
+    full = timed(scan, repeat)
+    print("{:>9,} users: index {:>8.2f} us, full scan {:>12.2f} us".format(
+        size, indexed, full))
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 100000, 1000000]
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for size in sizes:
+            run(size)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+""" GET /api/v1/users: one-shot jsonify of every user versus the
+streamed response with cached JSON text
+
+Usage: ./benchmark_users_view.py [USERS]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def legacy(app, users: list) -> int:
+    """ The former view: a list of to_json() dicts, jsonify'd at once;
+    returns the body size
+    """
+    from flask import jsonify
+    with app.app_context():
+        return len(jsonify([user.to_json() for user in users]).get_data())
+
+
+def streamed(app, users: list) -> int:
+    """ The current view, through the test client, consuming the body
+    chunk by chunk as a server would; returns the body size
+    """
+    response = app.test_client().get('/api/v1/users', buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return size
+
+
+def clear_cache(users: list):
+    """ Drops the cached JSON text of every user
+    """
+    for user in users:
+        user._json_cache = None
+
+
+def measure(name: str, function, app, users: list, cold: bool = False):
+    """ Prints the time and peak traced memory of one call
+    """
+    if cold:
+        clear_cache(users)
+    start = time.perf_counter()
+    function(app, users)
+    elapsed = time.perf_counter() - start
+    if cold:
+        clear_cache(users)
+    tracemalloc.start()
+    function(app, users)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("{:<16} {:>8.3f} s  peak {:>8.1f} MiB".format(
+        name, elapsed, peak / (1 << 20)))
+
+
+def run(size: int):
+    """ Serves `size` in-memory users both ways
+    """
+    os.environ.pop('AUTH_TYPE', None)
+    from api.v1.app import app
+    from models.base import DATA
+    from models.user import User
+    DATA['User'] = {}
+    for i in range(size):
+        user = User(email=f"user{i}@hbtn.io", first_name=f"First{i}")
+        DATA['User'][user.id] = user
+    users = User.all()
+    with app.app_context():
+        expected = [user.to_json() for user in User.all(lazy=True)]
+    body = app.test_client().get('/api/v1/users').get_data()
+    assert json.loads(body) == expected
+    measure("jsonify", legacy, app, users)
+    measure("streamed, cold", streamed, app, users, cold=True)
+    measure("streamed, cached", streamed, app, users)
+    users[0].first_name = "Changed"
+    users[0].save()
+    assert json.loads(users[0].to_json_string())['first_name'] == "Changed"
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        run(size)
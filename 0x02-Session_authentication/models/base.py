@@ -1,21 +1,463 @@
 #!/usr/bin/env python3
 """ Base module
 """
-from datetime import datetime
-from typing import TypeVar, List, Iterable
-from os import path
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+from datetime import datetime, timedelta
+from typing import TypeVar, List, Iterable, Iterator, Optional, Tuple
+from os import getenv, path
+import atexit
 import json
+import os
+import tempfile
+import threading
+import time
 import uuid
+from models.sqlite_store import LazyObjects, SQLiteStore
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+EPOCH = datetime(1970, 1, 1)
 DATA = {}
+# Guards DATA, the indexes and the store files across threads
+STORE_LOCK = threading.RLock()
+# Journal mode: compact once the journal is this many times the size of
+# the snapshot, and at least JOURNAL_COMPACT_MIN_SIZE bytes
+JOURNAL_COMPACT_RATIO = 2.0
+JOURNAL_COMPACT_MIN_SIZE = 1 << 20
+# class name -> attribute -> value -> {id: None}, ids in insertion order
+INDEXES = {}
+# class name -> id -> {attribute: indexed value}
+INDEXED_VALUES = {}
+# class name -> sorted ids, the stable order of page(); built on demand
+ORDERS = {}
+# class name -> attribute -> ([(value, id)] sorted, {id: value}), for the
+# sorted_attributes of query(); built on demand, None values left out
+SORTED_INDEXES = {}
+QUERY_OPERATORS = ('eq', 'in', 'prefix', 'gt', 'gte', 'lt', 'lte')
+# Open SQLite stores: (class name, path, pid) -> SQLiteStore
+_SQLITE_STORES = {}
+# Shared mode: class name -> (store, sequence number of the last change
+# loaded into DATA)
+_SYNCED = {}
+# Classes with a compaction running
+_COMPACTING = set()
+# Last fsync time per file, for the periodic fsync policy
+_LAST_FSYNC = {}
+# Files with a periodic fsync scheduled: file path -> threading.Timer
+_FSYNC_TIMERS = {}
+_FSYNC_LOCK = threading.Lock()
+# Writes deferred by group commit: class -> records
+_PENDING = {}
+_group_commit = None
+# Writes deferred by the Base.batch() of the current thread, in
+# `pending` (class -> records), None outside a batch
+_BATCH = threading.local()
+
+
+def _index_add(obj: TypeVar('Base')):
+    """ Index the current values of an object's indexed attributes
+    """
+    attributes = obj.__class__.indexed_attributes
+    if attributes:
+        _index_values(obj.__class__.__name__, obj.id,
+                      {attribute: getattr(obj, attribute, None)
+                       for attribute in attributes})
+
+
+def _index_values(s_class: str, obj_id: str, values: dict):
+    """ Index an object by id from its attribute values, without needing
+    the object itself
+    """
+    indexes = INDEXES.setdefault(s_class, {})
+    indexed = INDEXED_VALUES.setdefault(s_class, {})
+    old_values = indexed.get(obj_id, {})
+    new_values = {}
+    for attribute, value in values.items():
+        try:
+            hash(value)
+        except TypeError:
+            continue
+        new_values[attribute] = value
+        index = indexes.setdefault(attribute, {})
+        if attribute in old_values and old_values[attribute] != value:
+            _index_discard(index, old_values[attribute], obj_id)
+        index.setdefault(value, {})[obj_id] = None
+    for attribute in old_values.keys() - new_values.keys():
+        _index_discard(indexes[attribute], old_values[attribute], obj_id)
+    indexed[obj_id] = new_values
+
+
+def _index_discard(index: dict, value, obj_id: str):
+    """ Remove one object from the bucket of a value
+    """
+    bucket = index.get(value)
+    if bucket is not None:
+        bucket.pop(obj_id, None)
+        if not bucket:
+            del index[value]
+
+
+def _index_remove(s_class: str, obj_id: str):
+    """ Remove an object from the indexes of its class
+    """
+    old_values = INDEXED_VALUES.get(s_class, {}).pop(obj_id, {})
+    for attribute, value in old_values.items():
+        _index_discard(INDEXES[s_class][attribute], value, obj_id)
+    _order_remove(s_class, obj_id)
+    for index in SORTED_INDEXES.get(s_class, {}).values():
+        _sorted_discard(index, obj_id)
+
+
+def _apply_records(s_class: str, records: List[tuple]):
+    """ Bring DATA back in line with deferred save/remove records, for
+    the ones a load_from_file() since then has overwritten
+    """
+    objects = DATA.setdefault(s_class, {})
+    for op, value in records:
+        if op == 'save':
+            if objects.get(value.id) is not value:
+                objects[value.id] = value
+                _index_add(value)
+                _sorted_add(value)
+                _order_add(s_class, value.id)
+        elif value in objects:
+            del objects[value]
+            _index_remove(s_class, value)
+
+
+def _index_reset(s_class: str):
+    """ Drop the indexes of a class
+    """
+    INDEXES[s_class] = {}
+    INDEXED_VALUES[s_class] = {}
+    ORDERS.pop(s_class, None)
+    SORTED_INDEXES.pop(s_class, None)
+
+
+def _order_add(s_class: str, obj_id: str):
+    """ Insert an id in the order of its class, if built
+    """
+    ids = ORDERS.get(s_class)
+    if ids is not None:
+        i = bisect_left(ids, obj_id)
+        if i == len(ids) or ids[i] != obj_id:
+            ids.insert(i, obj_id)
+
+
+def _order_remove(s_class: str, obj_id: str):
+    """ Remove an id from the order of its class, if built
+    """
+    ids = ORDERS.get(s_class)
+    if ids is not None:
+        i = bisect_left(ids, obj_id)
+        if i < len(ids) and ids[i] == obj_id:
+            del ids[i]
+
+
+def _sorted_add(obj: TypeVar('Base')):
+    """ Update the built sorted indexes of an object's class
+    """
+    indexes = SORTED_INDEXES.get(obj.__class__.__name__, {})
+    for attribute, index in list(indexes.items()):
+        _sorted_discard(index, obj.id)
+        value = getattr(obj, _query_attribute(attribute), None)
+        if value is None:
+            continue
+        try:
+            keys = index[0]
+            keys.insert(bisect_left(keys, (value, obj.id)), (value, obj.id))
+        except TypeError:
+            # Not comparable with the other values: scan instead
+            del indexes[attribute]
+            continue
+        index[1][obj.id] = value
+
+
+def _sorted_discard(index: tuple, obj_id: str):
+    """ Remove one object from a sorted index
+    """
+    keys, values = index
+    if obj_id in values:
+        key = (values.pop(obj_id), obj_id)
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+
+class _SortedValues:
+    """ The values of a sorted index, for bisect
+    """
+
+    def __init__(self, keys: list):
+        """ Wrap the (value, id) keys
+        """
+        self.keys = keys
+
+    def __len__(self) -> int:
+        """ Number of keys
+        """
+        return len(self.keys)
+
+    def __getitem__(self, i: int):
+        """ Value of the i-th key
+        """
+        return self.keys[i][0]
+
+
+def _sorted_range(keys: list, conditions: list) -> Tuple[int, int]:
+    """ Return the [lo, hi) slice of sorted index keys matching all of
+    the (op, operand) conditions; raise TypeError if an operand does
+    not compare with the values
+    """
+    values = _SortedValues(keys)
+    lo, hi = 0, len(keys)
+    for op, operand in conditions:
+        if op in ('eq', 'gte', 'prefix'):
+            lo = max(lo, bisect_left(values, operand))
+        if op == 'gt':
+            lo = max(lo, bisect_right(values, operand))
+        if op in ('eq', 'lte'):
+            hi = min(hi, bisect_right(values, operand))
+        if op == 'lt':
+            hi = min(hi, bisect_left(values, operand))
+        if op == 'prefix' and operand and operand[-1] != chr(0x10ffff):
+            # Strings starting with "ab" sort before "ac"
+            following = operand[:-1] + chr(ord(operand[-1]) + 1)
+            hi = min(hi, bisect_left(values, following))
+    return lo, max(lo, hi)
+
+
+def _sorted_ids(keys: list, lo: int, hi: int, reverse: bool) -> Iterator:
+    """ Iterate the ids of a slice of sorted index keys
+    """
+    steps = range(hi - 1, lo - 1, -1) if reverse else range(lo, hi)
+    return (keys[i][1] for i in steps)
+
+
+def _query_attribute(attribute: str) -> str:
+    """ Name of the attribute queries compare: timestamps are compared
+    as epoch seconds
+    """
+    if attribute in ('created_at', 'updated_at'):
+        return '_' + attribute
+    return attribute
+
+
+def _query_operand(attribute: str, op: str, operand):
+    """ Check an operator and convert its operand like _query_attribute
+    converts the attribute
+    """
+    if op not in QUERY_OPERATORS:
+        raise ValueError("Unknown operator: {}".format(op))
+    if op == 'in':
+        operand = list(operand)
+    if attribute not in ('created_at', 'updated_at'):
+        return operand
+    if op == 'in':
+        return [_to_timestamp(value) for value in operand]
+    return _to_timestamp(operand)
+
+
+def _query_match(value, op: str, operand) -> bool:
+    """ Check one predicate against a value
+    """
+    if op == 'eq':
+        return value == operand
+    if op == 'in':
+        return value in operand
+    if value is None:
+        return False
+    try:
+        if op == 'prefix':
+            return isinstance(value, str) and value.startswith(operand)
+        if op == 'gt':
+            return value > operand
+        if op == 'gte':
+            return value >= operand
+        if op == 'lt':
+            return value < operand
+        return value <= operand
+    except TypeError:
+        return False
+
+
+def _to_timestamp(value) -> float:
+    """ Convert a naive UTC datetime, epoch seconds or TIMESTAMP_FORMAT
+    string to epoch seconds
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if type(value) is not datetime:
+        value = datetime.strptime(value, TIMESTAMP_FORMAT)
+    return (value - EPOCH) / timedelta(seconds=1)
+
+
+@lru_cache(maxsize=None)
+def _attribute_names(klass: type) -> tuple:
+    """ Names of the slotted attributes of a class, in declaration order
+    """
+    names = ['id', 'created_at', 'updated_at']
+    for parent in reversed(klass.__mro__):
+        if parent is not Base:
+            names.extend(name for name in parent.__dict__.get('__slots__', ())
+                         if not name.startswith('__'))
+    return tuple(names)
+
+
+def _should_fsync(file_path: str) -> bool:
+    """ Apply the MODEL_FSYNC policy to a write of `file_path`:
+    always, never (the default) or periodic, at most once every
+    MODEL_FSYNC_INTERVAL seconds (default 1) per file
+
+    A periodic write that is not fsynced schedules one at the end of
+    the interval, so the last writes of a burst reach the disk too.
+    """
+    policy = getenv("MODEL_FSYNC", "never")
+    if policy == "always":
+        return True
+    if policy != "periodic":
+        return False
+    now = time.monotonic()
+    interval = float(getenv("MODEL_FSYNC_INTERVAL", 1))
+    with _FSYNC_LOCK:
+        elapsed = now - _LAST_FSYNC.get(file_path, float('-inf'))
+        if elapsed < interval:
+            if file_path not in _FSYNC_TIMERS:
+                timer = threading.Timer(interval - elapsed,
+                                        _deferred_fsync, (file_path,))
+                timer.daemon = True
+                _FSYNC_TIMERS[file_path] = timer
+                timer.start()
+            return False
+        _LAST_FSYNC[file_path] = now
+        return True
+
+
+def _deferred_fsync(file_path: str):
+    """ fsync `file_path` and its directory, scheduled by _should_fsync
+    """
+    with _FSYNC_LOCK:
+        _FSYNC_TIMERS.pop(file_path, None)
+        _LAST_FSYNC[file_path] = time.monotonic()
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+    _fsync_directory(path.dirname(file_path))
+
+
+def _fsync_directory(directory: str):
+    """ Persist a rename by syncing its directory, where supported
+    """
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _new_file_mode() -> int:
+    """ Mode open() gives a new file: 0666 minus the process umask, read
+    without changing it, 0644 where /proc is not available
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return 0o666 & ~int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    return 0o644
+
+
+def _atomic_write(file_path: str, data: str):
+    """ Replace `file_path` with `data` without ever exposing a partial
+    file: write a temporary file next to it, then rename it over
+
+    The new file keeps the mode of the one it replaces, or gets the
+    umask default, rather than the 0600 of mkstemp.
+    """
+    directory = path.dirname(file_path)
+    try:
+        mode = os.stat(file_path).st_mode & 0o7777
+    except OSError:
+        mode = _new_file_mode()
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.',
+                                    prefix=path.basename(file_path) + '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            os.fchmod(fd, mode)
+            f.write(data)
+            f.flush()
+            sync = _should_fsync(file_path)
+            if sync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    if sync:
+        _fsync_directory(directory)
 
 
 class Base():
     """ Base class
+
+    Subclasses list in `indexed_attributes` the attributes to keep a
+    hash index on: search() uses it whenever a query covers one of
+    them. Indexes hold the values objects had when last saved or
+    loaded. query() also uses sorted indexes of `sorted_attributes`.
+
+    `storage` picks how objects are persisted, defaulting to the
+    MODEL_STORAGE environment variable:
+      - json: save() and remove() rewrite .db_<Class>.json
+      - journal: save() and remove() append one line to
+        .db_<Class>.journal, replayed by load_from_file() over the
+        .db_<Class>.json snapshot and compacted into it in the
+        background once it outgrows the snapshot
+      - sqlite: one row per object in .db_<Class>.sqlite, with epoch
+        timestamps; load_from_file() only reads rows and indexes them,
+        objects are built on first access
+      - shared: sqlite for several processes, e.g. gunicorn workers,
+        all in shared mode; each keeps DATA coherent by applying the
+        changes of the others before count(), get() and search(), and
+        load_from_file() only loads what changed since the last time
+
+    Inside `with Base.batch():`, or while group commit runs, writes are
+    deferred and coalesced into one write per class.
+
+    Snapshots are replaced atomically; MODEL_FSYNC decides whether
+    writes are also fsynced (see _should_fsync).
+
+    Instances are slotted and keep created_at/updated_at as epoch
+    seconds, converted to datetime on access; subclasses declare
+    their attributes in `__slots__` to stay compact.
+
+    to_json_string() caches the JSON text of an object until its next
+    save(): change objects through save() to keep it current.
     """
 
+    __slots__ = ('id', '_created_at', '_updated_at', '_json_cache')
+
+    indexed_attributes = ()
+    sorted_attributes = ()
+    storage = None
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
@@ -25,16 +467,40 @@ class Base():
 
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = kwargs.get('created_at')
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = kwargs.get('updated_at')
         else:
             self.updated_at = datetime.utcnow()
 
+    @property
+    def created_at(self) -> datetime:
+        """ Getter of the creation time
+        """
+        return EPOCH + timedelta(seconds=self._created_at)
+
+    @created_at.setter
+    def created_at(self, value):
+        """ Setter of the creation time: a datetime, epoch seconds or a
+        TIMESTAMP_FORMAT string
+        """
+        self._created_at = _to_timestamp(value)
+
+    @property
+    def updated_at(self) -> datetime:
+        """ Getter of the last update time
+        """
+        return EPOCH + timedelta(seconds=self._updated_at)
+
+    @updated_at.setter
+    def updated_at(self, value):
+        """ Setter of the last update time: a datetime, epoch seconds
+        or a TIMESTAMP_FORMAT string
+        """
+        self._updated_at = _to_timestamp(value)
+
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
         """
@@ -48,77 +514,499 @@ class Base():
         """ Convert the object a JSON dictionary
         """
         result = {}
-        for key, value in self.__dict__.items():
+        names = _attribute_names(self.__class__)
+        if hasattr(self, '__dict__'):
+            names += tuple(self.__dict__)
+        for key in names:
             if not for_serialization and key[0] == '_':
                 continue
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                continue
             if type(value) is datetime:
                 result[key] = value.strftime(TIMESTAMP_FORMAT)
             else:
                 result[key] = value
         return result
 
+    def to_json_string(self) -> str:
+        """ Return the JSON text of to_json(), cached until save()
+        """
+        cached = getattr(self, '_json_cache', None)
+        if cached is None:
+            cached = self._json_cache = json.dumps(self.to_json())
+        return cached
+
+    @classmethod
+    def storage_mode(cls) -> str:
+        """ Return the storage mode of the class
+        """
+        return cls.storage or getenv("MODEL_STORAGE", "json")
+
+    @classmethod
+    def file_path(cls) -> str:
+        """ Return the path of the snapshot file
+        """
+        if cls.storage_mode() in ('sqlite', 'shared'):
+            return ".db_{}.sqlite".format(cls.__name__)
+        return ".db_{}.json".format(cls.__name__)
+
+    @classmethod
+    def journal_path(cls) -> str:
+        """ Return the path of the journal file
+        """
+        return ".db_{}.journal".format(cls.__name__)
+
     @classmethod
     def load_from_file(cls):
         """ Load all objects from file
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
+        file_path = cls.file_path()
+        mode = cls.storage_mode()
+        # Deferred writes would be lost under the reloaded DATA
+        cls.flush_pending()
+        if mode == 'shared':
+            cls.sync()
+            return
+        if mode == 'sqlite':
+            cls.load_from_sqlite()
+            return
+        with STORE_LOCK:
+            DATA[s_class] = {}
+            _index_reset(s_class)
+            if path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    objs_json = json.load(f)
+                    for obj_id, obj_json in objs_json.items():
+                        obj = cls(**obj_json)
+                        DATA[s_class][obj_id] = obj
+                        _index_add(obj)
+            cls.replay_journal()
+
+    @classmethod
+    def sqlite_store(cls) -> SQLiteStore:
+        """ Return the SQLite store of the class, opened once per file
+        """
+        # Connections are not shared with forked children
+        key = (cls.__name__, path.abspath(cls.file_path()), os.getpid())
+        with STORE_LOCK:
+            store = _SQLITE_STORES.get(key)
+            if store is None:
+                store = _SQLITE_STORES[key] = SQLiteStore(
+                    cls.file_path(), cls.indexed_attributes,
+                    shared=cls.storage_mode() == 'shared')
+            return store
+
+    @classmethod
+    def from_row(cls, row: tuple) -> TypeVar('Base'):
+        """ Build an object from a SQLite row
+        """
+        obj_json = json.loads(row[3])
+        obj_json.update(zip(cls.indexed_attributes, row[4:]),
+                        id=row[0], created_at=row[1], updated_at=row[2])
+        return cls(**obj_json)
+
+    def to_row(self) -> tuple:
+        """ Convert the object to a SQLite row, indexed attributes going
+        to their own columns rather than to data
+        """
+        attributes = self.__class__.indexed_attributes
+        columns = ('id', 'created_at', 'updated_at') + attributes
+        data = {key: value for key, value in self.to_json(True).items()
+                if key not in columns}
+        return (self.id, int(self._created_at),
+                int(self._updated_at), json.dumps(data)) + \
+            tuple(getattr(self, attribute, None) for attribute in attributes)
+
+    @classmethod
+    def load_from_sqlite(cls):
+        """ Load the rows of the SQLite store, leaving objects to be
+        materialized on first access
+        """
+        s_class = cls.__name__
+        with STORE_LOCK:
+            store = cls.sqlite_store()
+            objects = LazyObjects(cls.from_row)
+            DATA[s_class] = objects
+            _index_reset(s_class)
+            rows, seq = store.snapshot()
+            for row in rows:
+                cls.load_row(row)
+            if store.shared:
+                _SYNCED[s_class] = (store, seq)
+
+    @classmethod
+    def load_row(cls, row: tuple):
+        """ Add or replace an object in DATA from its SQLite row
+        """
+        s_class = cls.__name__
+        DATA[s_class].add_row(row[0], row)
+        _order_add(s_class, row[0])
+        # Rebuilt on demand rather than materializing the object now
+        SORTED_INDEXES.pop(s_class, None)
+        if cls.indexed_attributes:
+            _index_values(s_class, row[0],
+                          dict(zip(cls.indexed_attributes, row[4:])))
+
+    @classmethod
+    def sync(cls):
+        """ In shared mode, apply the changes other processes made since
+        the last load or sync
+        """
+        if cls.storage_mode() != 'shared':
             return
+        s_class = cls.__name__
+        with STORE_LOCK:
+            store = cls.sqlite_store()
+            synced = _SYNCED.get(s_class)
+            if synced is None or synced[0] is not store or \
+                    not isinstance(DATA.get(s_class), LazyObjects):
+                cls.load_from_sqlite()
+                return
+            if not store.changed():
+                return
+            changes = store.changes_since(synced[1])
+            if changes is None:
+                cls.load_from_sqlite()
+                return
+            seq, saved, removed = changes
+            for row in saved:
+                cls.load_row(row)
+            for obj_id in removed:
+                if obj_id in DATA[s_class]:
+                    del DATA[s_class][obj_id]
+                    _index_remove(s_class, obj_id)
+            _SYNCED[s_class] = (store, seq)
+
+    @classmethod
+    def stored_rows(cls) -> Iterable[tuple]:
+        """ Iterate the SQLite rows of all objects, reusing the loaded
+        rows of objects never materialized
+        """
+        objects = DATA[cls.__name__]
+        if isinstance(objects, LazyObjects):
+            for obj in objects.raw_items():
+                yield obj[1] if type(obj[1]) is tuple else obj[1].to_row()
+        else:
+            for obj in objects.values():
+                yield obj.to_row()
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @classmethod
+    def replay_journal(cls):
+        """ Apply the journal records on top of the loaded snapshot
+        """
+        s_class = cls.__name__
+        journal_path = cls.journal_path()
+        if not path.exists(journal_path):
+            return
+        with open(journal_path, 'rb+') as f:
+            offset = 0
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("Unterminated journal record")
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn last line of an interrupted append: drop it so
+                    # that later appends are not hidden behind it
+                    f.truncate(offset)
+                    break
+                offset += len(line)
+                if record.get('op') == 'save':
+                    obj = cls(**record['obj'])
+                    DATA[s_class][obj.id] = obj
+                    _index_add(obj)
+                elif DATA[s_class].pop(record.get('id'), None) is not None:
+                    _index_remove(s_class, record['id'])
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
         s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        file_path = cls.file_path()
+        if cls.storage_mode() in ('sqlite', 'shared'):
+            with STORE_LOCK:
+                cls.sqlite_store().replace_all(cls.stored_rows())
+            return
+        with STORE_LOCK:
+            objs_json = {}
+            for obj_id, obj in DATA[s_class].items():
+                objs_json[obj_id] = obj.to_json(True)
+
+            _atomic_write(file_path, json.dumps(objs_json))
+
+    @classmethod
+    def append_to_journal(cls, records: List[tuple]):
+        """ Append save/remove records to the journal
+        """
+        lines = ''.join(
+            json.dumps({'op': 'save', 'obj': value.to_json(True)}
+                       if op == 'save' else {'op': 'remove', 'id': value})
+            + '\n' for op, value in records)
+        with STORE_LOCK:
+            with open(cls.journal_path(), 'a') as f:
+                f.write(lines)
+                f.flush()
+                if _should_fsync(cls.journal_path()):
+                    os.fsync(f.fileno())
+        if cls.journal_needs_compaction():
+            cls.compact_in_background()
+
+    @classmethod
+    def journal_needs_compaction(cls) -> bool:
+        """ Check if the journal outgrew the snapshot
+        """
+        try:
+            journal_size = os.stat(cls.journal_path()).st_size
+        except OSError:
+            return False
+        try:
+            snapshot_size = os.stat(cls.file_path()).st_size
+        except OSError:
+            snapshot_size = 0
+        return journal_size >= JOURNAL_COMPACT_MIN_SIZE and \
+            journal_size > snapshot_size * JOURNAL_COMPACT_RATIO
+
+    @classmethod
+    def compact(cls):
+        """ Fold the journal into a fresh snapshot
+        """
+        with STORE_LOCK:
+            cls.save_to_file()
+            if path.exists(cls.journal_path()):
+                os.remove(cls.journal_path())
+
+    @classmethod
+    def compact_in_background(cls):
+        """ Run compact() on a daemon thread, once at a time per class
+        """
+        with STORE_LOCK:
+            if cls.__name__ in _COMPACTING:
+                return
+            _COMPACTING.add(cls.__name__)
+
+        def _compact():
+            try:
+                cls.compact()
+            finally:
+                with STORE_LOCK:
+                    _COMPACTING.discard(cls.__name__)
+
+        threading.Thread(target=_compact, daemon=True).start()
+
+    @classmethod
+    def write_records(cls, records: List[tuple]):
+        """ Persist ('save', object) and ('remove', id) records with the
+        storage mode of the class
+        """
+        mode = cls.storage_mode()
+        if mode == 'journal':
+            cls.append_to_journal(records)
+        elif mode in ('sqlite', 'shared'):
+            with STORE_LOCK:
+                cls.sqlite_store().apply(
+                    (op, value.to_row() if op == 'save' else value)
+                    for op, value in records)
+        else:
+            with STORE_LOCK:
+                # Records of other threads' batches may predate a reload
+                _apply_records(cls.__name__, records)
+                cls.save_to_file()
+
+    @classmethod
+    def persist(cls, record: tuple):
+        """ Persist one save/remove record, now or at the next flush
+        """
+        batch = getattr(_BATCH, 'pending', None)
+        if batch is not None:
+            batch.setdefault(cls, []).append(record)
+            return
+        with STORE_LOCK:
+            if _group_commit is not None:
+                _PENDING.setdefault(cls, []).append(record)
+                return
+            cls.write_records([record])
+
+    @staticmethod
+    def flush():
+        """ Write the records deferred by group commit and by the batch()
+        of the current thread
+        """
+        global _PENDING
+        batch = getattr(_BATCH, 'pending', None)
+        with STORE_LOCK:
+            pending, _PENDING = _PENDING, {}
+            if batch:
+                for klass, records in batch.items():
+                    pending.setdefault(klass, []).extend(records)
+                batch.clear()
+            for klass, records in pending.items():
+                klass.write_records(records)
+
+    @classmethod
+    def flush_pending(cls):
+        """ Write the records of the class deferred by group commit and
+        by the batch() of the current thread
+        """
+        batch = getattr(_BATCH, 'pending', None)
+        with STORE_LOCK:
+            records = _PENDING.pop(cls, [])
+            if batch:
+                records.extend(batch.pop(cls, []))
+            if records:
+                cls.write_records(records)
+
+    @staticmethod
+    @contextmanager
+    def batch():
+        """ Coalesce the saves and removes of the block into one write
+        per class, done when the outermost batch exits
+
+        Batches are per thread: the writes of other threads are not
+        deferred. Under group commit, the batch is handed over to the
+        next group flush instead.
+        """
+        if getattr(_BATCH, 'pending', None) is not None:
+            yield
+            return
+        _BATCH.pending = {}
+        try:
+            yield
+        finally:
+            batch, _BATCH.pending = _BATCH.pending, None
+            with STORE_LOCK:
+                if _group_commit is not None:
+                    for klass, records in batch.items():
+                        _PENDING.setdefault(klass, []).extend(records)
+                else:
+                    for klass, records in batch.items():
+                        klass.write_records(records)
+
+    @staticmethod
+    def start_group_commit(interval: float = None):
+        """ Defer all writes and flush them every `interval` seconds,
+        MODEL_GROUP_COMMIT_INTERVAL (default 1) if not given
+        """
+        global _group_commit
+        if interval is None:
+            interval = float(getenv("MODEL_GROUP_COMMIT_INTERVAL", 1))
+        with STORE_LOCK:
+            if _group_commit is not None:
+                return
+            stop = threading.Event()
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            def _run():
+                while not stop.wait(interval):
+                    Base.flush()
+
+            _group_commit = (stop, threading.Thread(target=_run, daemon=True))
+            _group_commit[1].start()
+
+    @staticmethod
+    def stop_group_commit():
+        """ Stop group commit and flush the pending writes
+        """
+        global _group_commit
+        with STORE_LOCK:
+            group_commit, _group_commit = _group_commit, None
+        if group_commit is not None:
+            group_commit[0].set()
+            group_commit[1].join()
+        Base.flush()
 
     def save(self):
         """ Save current object
         """
         s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        with STORE_LOCK:
+            self.updated_at = datetime.utcnow()
+            self._json_cache = None
+            DATA[s_class][self.id] = self
+            _index_add(self)
+            _sorted_add(self)
+            _order_add(s_class, self.id)
+            self.__class__.persist(('save', self))
 
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with STORE_LOCK:
+            if DATA[s_class].get(self.id) is not None:
+                del DATA[s_class][self.id]
+                _index_remove(s_class, self.id)
+                self.__class__.persist(('remove', self.id))
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
         s_class = cls.__name__
+        cls.sync()
         return len(DATA[s_class].keys())
 
     @classmethod
-    def all(cls) -> Iterable[TypeVar('Base')]:
-        """ Return all objects
+    def all(cls, lazy: bool = False) -> Iterable[TypeVar('Base')]:
+        """ Return all objects; with `lazy`, an iterator over them in
+        page() order instead of a list
         """
+        if lazy:
+            return cls.iterate()
         return cls.search()
 
+    @classmethod
+    def ordered_ids(cls) -> List[str]:
+        """ Return the ids of all objects, sorted: the stable order of
+        page(), built on first use and then kept up to date
+        """
+        s_class = cls.__name__
+        with STORE_LOCK:
+            ids = ORDERS.get(s_class)
+            # Rebuild if DATA was changed behind the store's back
+            if ids is None or len(ids) != len(DATA[s_class]):
+                ids = ORDERS[s_class] = sorted(DATA[s_class])
+            return ids
+
+    @classmethod
+    def page(cls, limit: int, cursor: str = None) \
+            -> Tuple[List[TypeVar('Base')], Optional[str]]:
+        """ Return up to `limit` objects following the id `cursor` (from
+        the start if None), and the cursor of the next page, None after
+        the last one
+        """
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        s_class = cls.__name__
+        cls.sync()
+        with STORE_LOCK:
+            ids = cls.ordered_ids()
+            start = 0 if cursor is None else bisect_right(ids, cursor)
+            end = start + limit
+            objs = [DATA[s_class][obj_id] for obj_id in ids[start:end]]
+            next_cursor = ids[end - 1] if end < len(ids) else None
+        return objs, next_cursor
+
+    @classmethod
+    def iterate(cls, batch_size: int = 1000) -> Iterator[TypeVar('Base')]:
+        """ Iterate all objects in page() order, one page at a time, so
+        that saves and removes meanwhile are safe
+        """
+        cursor = None
+        while True:
+            objs, cursor = cls.page(batch_size, cursor)
+            yield from objs
+            if cursor is None:
+                return
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
         s_class = cls.__name__
+        cls.sync()
         return DATA[s_class].get(id)
 
     @classmethod
@@ -126,6 +1014,7 @@ class Base():
         """ Search all objects with matching attributes
         """
         s_class = cls.__name__
+        cls.sync()
 
         def _search(obj):
             if len(attributes) == 0:
@@ -135,4 +1024,155 @@ class Base():
                     return False
             return True
 
-        return list(filter(_search, DATA[s_class].values()))
+        # Narrow down to the smallest matching index bucket, if any
+        objects = DATA[s_class]
+        smallest = None
+        indexes = INDEXES.get(s_class, {})
+        for k, v in attributes.items():
+            if k not in indexes:
+                continue
+            try:
+                bucket = indexes[k].get(v, {})
+            except TypeError:
+                continue
+            if len(bucket) < len(objects if smallest is None else smallest):
+                smallest = bucket
+        if smallest is None:
+            candidates = objects.values()
+        else:
+            candidates = [objects[obj_id] for obj_id in smallest]
+
+        return list(filter(_search, candidates))
+
+    @classmethod
+    def sorted_index(cls, attribute: str) -> Optional[tuple]:
+        """ Return the sorted index of one of `sorted_attributes`, built
+        on first use; None if its values do not compare
+        """
+        if attribute not in cls.sorted_attributes:
+            return None
+        s_class = cls.__name__
+        with STORE_LOCK:
+            indexes = SORTED_INDEXES.setdefault(s_class, {})
+            index = indexes.get(attribute)
+            if index is None:
+                name = _query_attribute(attribute)
+                values = {}
+                for obj_id, obj in DATA[s_class].items():
+                    value = getattr(obj, name, None)
+                    if value is not None:
+                        values[obj_id] = value
+                try:
+                    keys = sorted(zip(values.values(), values.keys()))
+                except TypeError:
+                    return None
+                index = indexes[attribute] = (keys, values)
+            return index
+
+    @classmethod
+    def query(cls, filters: dict = None, order_by: str = None,
+              limit: int = None, fields: Iterable[str] = None) -> list:
+        """ Return the objects matching all `filters`
+
+        `filters` maps attributes to a value to be equal to, or to a
+        dict of operator: operand, operators being eq, in (any
+        iterable), prefix, gt, gte, lt and lte. created_at and
+        updated_at compare with datetimes, epoch seconds or
+        TIMESTAMP_FORMAT strings.
+
+        `order_by` names an attribute, prefixed with '-' for descending
+        order; objects where it is None come last. `limit` caps the
+        number of results. With `fields`, results are to_json() dicts
+        restricted to those keys instead of objects.
+
+        The most selective predicate an index can answer picks the
+        candidates, the others are checked on them: hash indexes of
+        `indexed_attributes` answer eq and in, sorted indexes of
+        `sorted_attributes` answer eq, prefix and ranges, and give
+        ordered candidates, so that a limit stops the query early.
+        """
+        s_class = cls.__name__
+        predicates = []
+        for attribute, condition in (filters or {}).items():
+            if not isinstance(condition, dict):
+                condition = {'eq': condition}
+            for op, operand in condition.items():
+                predicates.append((_query_attribute(attribute), op,
+                                   _query_operand(attribute, op, operand)))
+        descending = order_by is not None and order_by.startswith('-')
+        if descending:
+            order_by = order_by[1:]
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+        cls.sync()
+
+        with STORE_LOCK:
+            objects = DATA[s_class]
+            ids, size, ordered = None, len(objects), False
+            indexes = INDEXES.get(s_class, {})
+            for attribute, op, operand in predicates:
+                if attribute not in indexes or op not in ('eq', 'in'):
+                    continue
+                try:
+                    buckets = [indexes[attribute].get(value, {}) for value
+                               in (operand if op == 'in' else [operand])]
+                except TypeError:
+                    continue
+                if sum(map(len, buckets)) < size:
+                    ids = list(dict.fromkeys(
+                        obj_id for bucket in buckets for obj_id in bucket))
+                    size, ordered = len(ids), False
+            for attribute in cls.sorted_attributes:
+                name = _query_attribute(attribute)
+                conditions = [(op, operand) for a, op, operand in predicates
+                              if a == name and op != 'in']
+                if not conditions and attribute != order_by:
+                    continue
+                # Sorted indexes leave None out, they cannot match it
+                if any(operand is None for _, operand in conditions):
+                    continue
+                index = cls.sorted_index(attribute)
+                # Ordering alone needs every object in the index
+                if index is None or not conditions and \
+                        len(index[1]) != len(objects):
+                    continue
+                try:
+                    lo, hi = _sorted_range(index[0], conditions)
+                except TypeError:
+                    continue
+                if hi - lo < size or \
+                        hi - lo == size and attribute == order_by:
+                    ordered = attribute == order_by
+                    ids = _sorted_ids(index[0], lo, hi,
+                                      ordered and descending)
+                    size = hi - lo
+
+            candidates = objects.values() if ids is None else \
+                (objects[obj_id] for obj_id in ids)
+            results = (obj for obj in candidates
+                       if all(_query_match(getattr(obj, attribute, None),
+                                           op, operand)
+                              for attribute, op, operand in predicates))
+            if order_by is not None and not ordered:
+                name = _query_attribute(order_by)
+                results = list(results)
+                present = [obj for obj in results
+                           if getattr(obj, name, None) is not None]
+                try:
+                    present.sort(key=lambda obj: getattr(obj, name),
+                                 reverse=descending)
+                except TypeError:
+                    raise ValueError("Cannot order by {}".format(order_by))
+                results = present + [obj for obj in results
+                                     if getattr(obj, name, None) is None]
+            results = list(islice(results, limit))
+
+        if fields is not None:
+            fields = set(fields)
+            return [{key: value for key, value in obj.to_json().items()
+                     if key in fields} for obj in results]
+        return results
+
+
+# Do not lose deferred writes at interpreter exit
+atexit.register(Base.stop_group_commit)
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Password hasher registry
+
+Every hasher exposes the same hash/verify interface and is recognised
+from the prefix of the hashes it produces, so stored hashes of several
+schemes can be verified side by side:
+
+    bcrypt         $2b$<rounds>$<salt+hash>
+    scrypt         scrypt$<n>$<r>$<p>$<salt>$<hash>
+    pbkdf2_sha256  pbkdf2_sha256$<iterations>$<salt>$<hash>
+    sha256         <64 hex digits>  (legacy, unsalted)
+"""
+import base64
+import hashlib
+import hmac
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Union
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+
+# bcrypt work factor used when BCRYPT_ROUNDS is not set
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+def _b64encode(data: bytes) -> str:
+    """
+    Encodes bytes as unpadded base64
+    """
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(data: str) -> bytes:
+    """
+    Decodes unpadded base64
+    """
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+
+def bcrypt_rounds(rounds: int = None) -> int:
+    """
+    Returns the bcrypt work factor: `rounds` if given, else the
+    BCRYPT_ROUNDS environment variable, else DEFAULT_BCRYPT_ROUNDS
+    """
+    if rounds is not None:
+        return rounds
+    try:
+        return int(os.getenv('BCRYPT_ROUNDS', DEFAULT_BCRYPT_ROUNDS))
+    except ValueError:
+        return DEFAULT_BCRYPT_ROUNDS
+
+
+def _to_str(hashed: Union[str, bytes]) -> str:
+    """
+    Accepts hashes stored either as str or as bytes
+    """
+    if isinstance(hashed, bytes):
+        return hashed.decode('ascii')
+    return hashed
+
+
+class Hasher(ABC):
+    """ Base class of the password hashers
+    """
+
+    name = None
+    prefixes = ()
+
+    def identify(self, hashed: str) -> bool:
+        """
+        Checks if `hashed` was produced by this hasher
+        """
+        return hashed.startswith(self.prefixes)
+
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        """
+        Returns a new hash of `password`
+        """
+
+    @abstractmethod
+    def verify(self, hashed: str, password: str) -> bool:
+        """
+        Checks `password` against a hash produced by this hasher
+        """
+
+
+class BcryptHasher(Hasher):
+    """ bcrypt, through the bcrypt package
+    """
+
+    name = 'bcrypt'
+    prefixes = ('$2a$', '$2b$', '$2y$')
+
+    def __init__(self, rounds: int = None):
+        """
+        Args:
+            rounds: bcrypt work factor, None follows BCRYPT_ROUNDS at
+                    hashing time, see bcrypt_rounds
+        """
+        self.rounds = rounds
+
+    def hash(self, password: str) -> str:
+        """
+        Returns a new hash of `password`
+        """
+        salt = bcrypt.gensalt(rounds=bcrypt_rounds(self.rounds))
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('ascii')
+
+    def verify(self, hashed: str, password: str) -> bool:
+        """
+        Checks `password` against a bcrypt hash
+        """
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'),
+                                  hashed.encode('ascii'))
+        except ValueError:
+            return False
+
+
+class ScryptHasher(Hasher):
+    """ scrypt, from hashlib
+    """
+
+    name = 'scrypt'
+    prefixes = ('scrypt$',)
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1):
+        """
+        Args:
+            n: CPU/memory cost
+            r: block size
+            p: parallelization
+        """
+        self.n = n
+        self.r = r
+        self.p = p
+
+    @staticmethod
+    def _derive(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        """
+        Derives the scrypt key of `password`
+        """
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r,
+                              p=p, maxmem=2 * 128 * n * r * p, dklen=32)
+
+    def hash(self, password: str) -> str:
+        """
+        Returns a new hash of `password`
+        """
+        salt = os.urandom(16)
+        key = self._derive(password, salt, self.n, self.r, self.p)
+        return f"scrypt${self.n}${self.r}${self.p}$" \
+               f"{_b64encode(salt)}${_b64encode(key)}"
+
+    def verify(self, hashed: str, password: str) -> bool:
+        """
+        Checks `password` against a scrypt hash
+        """
+        try:
+            _, n, r, p, salt, key = hashed.split('$')
+            derived = self._derive(password, _b64decode(salt),
+                                   int(n), int(r), int(p))
+            return hmac.compare_digest(derived, _b64decode(key))
+        except ValueError:
+            return False
+
+
+class PBKDF2Hasher(Hasher):
+    """ PBKDF2 with HMAC-SHA256, from hashlib
+    """
+
+    name = 'pbkdf2_sha256'
+    prefixes = ('pbkdf2_sha256$',)
+
+    def __init__(self, iterations: int = 600000):
+        """
+        Args:
+            iterations: number of HMAC iterations
+        """
+        self.iterations = iterations
+
+    def hash(self, password: str) -> str:
+        """
+        Returns a new hash of `password`
+        """
+        salt = os.urandom(16)
+        key = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt,
+                                  self.iterations)
+        return f"pbkdf2_sha256${self.iterations}$" \
+               f"{_b64encode(salt)}${_b64encode(key)}"
+
+    def verify(self, hashed: str, password: str) -> bool:
+        """
+        Checks `password` against a PBKDF2 hash
+        """
+        try:
+            _, iterations, salt, key = hashed.split('$')
+            derived = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'),
+                                          _b64decode(salt), int(iterations))
+            return hmac.compare_digest(derived, _b64decode(key))
+        except ValueError:
+            return False
+
+
+class SHA256Hasher(Hasher):
+    """ Legacy unsalted SHA-256 hex digest, kept to verify old hashes
+    """
+
+    name = 'sha256'
+
+    def identify(self, hashed: str) -> bool:
+        """
+        Legacy hashes have no prefix: 64 lowercase hex digits
+        """
+        return len(hashed) == 64 and \
+            all(c in '0123456789abcdef' for c in hashed)
+
+    def hash(self, password: str) -> str:
+        """
+        Returns the hex digest of `password`
+        """
+        return hashlib.sha256(password.encode()).hexdigest().lower()
+
+    def verify(self, hashed: str, password: str) -> bool:
+        """
+        Checks `password` against a hex digest
+        """
+        return hmac.compare_digest(self.hash(password), hashed)
+
+
+HASHERS: Dict[str, Hasher] = {}
+
+
+def register_hasher(hasher: Hasher):
+    """
+    Adds a hasher to the registry, replacing one of the same name
+    """
+    HASHERS[hasher.name] = hasher
+
+
+def get_hasher(name: str) -> Hasher:
+    """
+    Returns the registered hasher called `name`
+    Raises:
+        ValueError: if no such hasher is registered
+    """
+    if name not in HASHERS:
+        raise ValueError(f"Unknown password hasher: {name}")
+    return HASHERS[name]
+
+
+def identify_hasher(hashed: Union[str, bytes]) -> Hasher:
+    """
+    Returns the hasher that produced `hashed`, or None
+    """
+    hashed = _to_str(hashed)
+    for hasher in HASHERS.values():
+        if hasher.identify(hashed):
+            return hasher
+    return None
+
+
+def hash_password(password: str, name: str) -> str:
+    """
+    Hashes `password` with the hasher called `name`
+    """
+    return get_hasher(name).hash(password)
+
+
+def verify_password(hashed: Union[str, bytes], password: str) -> bool:
+    """
+    Checks `password` against a hash of any registered scheme
+    Returns:
+        True if the password matches, False otherwise or if the
+        scheme of `hashed` is unknown
+    """
+    if hashed is None or password is None:
+        return False
+    hashed = _to_str(hashed)
+    hasher = identify_hasher(hashed)
+    if hasher is None:
+        return False
+    return hasher.verify(hashed, password)
+
+
+if bcrypt is not None:
+    register_hasher(BcryptHasher())
+register_hasher(ScryptHasher())
+register_hasher(PBKDF2Hasher())
+register_hasher(SHA256Hasher())
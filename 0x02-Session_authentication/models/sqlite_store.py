@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+""" SQLite storage module
+"""
+from collections.abc import MutableMapping
+from typing import Callable, Iterable, List, Optional, Tuple
+import sqlite3
+import threading
+import uuid
+
+
+class LazyObjects(MutableMapping):
+    """ Mapping of id to object where objects loaded from storage are
+    kept as raw rows and only built on first access
+    """
+
+    def __init__(self, materialize: Callable[[tuple], object]):
+        """ Initialize an empty mapping
+        """
+        self._items = {}
+        self._materialize = materialize
+
+    def add_row(self, obj_id: str, row: tuple):
+        """ Add a stored row, to be materialized when accessed
+        """
+        self._items[obj_id] = row
+
+    def raw_items(self) -> Iterable[tuple]:
+        """ Iterate (id, object or row) pairs without materializing
+        """
+        return self._items.items()
+
+    def __getitem__(self, obj_id: str):
+        """ Return the object, building it from its row if needed
+        """
+        value = self._items[obj_id]
+        if type(value) is tuple:
+            value = self._items[obj_id] = self._materialize(value)
+        return value
+
+    def __setitem__(self, obj_id: str, obj):
+        """ Add or replace an object
+        """
+        self._items[obj_id] = obj
+
+    def __delitem__(self, obj_id: str):
+        """ Remove an object
+        """
+        del self._items[obj_id]
+
+    def __iter__(self):
+        """ Iterate the ids
+        """
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        """ Number of objects
+        """
+        return len(self._items)
+
+    def __contains__(self, obj_id) -> bool:
+        """ Check an id without materializing its object
+        """
+        return obj_id in self._items
+
+
+class SQLiteStore:
+    """ Objects of one model class in a SQLite file
+
+    Rows are (id, created_at, updated_at, data, *indexed values):
+    timestamps are epoch seconds, data is the JSON of the other
+    attributes and every indexed attribute has its own column, so
+    indexes can be rebuilt without decoding data.
+
+    A shared store is written by several processes: the file is in WAL
+    mode, writers wait up to `timeout` seconds for the SQLite write
+    lock, and every change is logged with the origin store that made
+    it so that the others can catch up with changes_since(). The log
+    keeps the last `keep_changes` entries.
+    """
+
+    def __init__(self, file_path: str, indexed_attributes: tuple = (),
+                 shared: bool = False, timeout: float = 30.0,
+                 keep_changes: int = 100000):
+        """ Open (and create if needed) the store
+        """
+        self.file_path = file_path
+        self.indexed_attributes = tuple(indexed_attributes)
+        self.columns = ('id', 'created_at', 'updated_at', 'data') + \
+            self.indexed_attributes
+        self.shared = shared
+        self.keep_changes = keep_changes
+        self.origin = uuid.uuid4().hex
+        self._data_version = None
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(file_path, timeout=timeout,
+                                           isolation_level=None,
+                                           check_same_thread=False)
+        if shared:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._create_schema()
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        """ Quote a column name
+        """
+        return '"{}"'.format(name.replace('"', '""'))
+
+    def _create_schema(self):
+        """ Create the objects table, adding missing indexed columns
+        """
+        with self._lock:
+            # One process at a time, others may be opening the file too
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS objects (id TEXT PRIMARY "
+                    "KEY, created_at INTEGER, updated_at INTEGER, data TEXT)")
+                if self.shared:
+                    self._connection.execute(
+                        "CREATE TABLE IF NOT EXISTS changes (seq INTEGER "
+                        "PRIMARY KEY AUTOINCREMENT, id TEXT, origin TEXT)")
+                existing = {row[1] for row in self._connection.execute(
+                    "PRAGMA table_info(objects)")}
+                for attribute in self.indexed_attributes:
+                    if attribute not in existing:
+                        self._add_column(attribute)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def _add_column(self, attribute: str):
+        """ Add the column of an indexed attribute, filled from data
+        """
+        self._connection.execute("ALTER TABLE objects ADD COLUMN {}".format(
+            self._quote(attribute)))
+        self._connection.execute(
+            "UPDATE objects SET {} = json_extract(data, ?)".format(
+                self._quote(attribute)), ('$."{}"'.format(attribute),))
+
+    def rows(self) -> List[tuple]:
+        """ Return every stored row, in insertion order
+        """
+        return self.snapshot()[0]
+
+    def snapshot(self) -> Tuple[List[tuple], int]:
+        """ Return every stored row, in insertion order, and the sequence
+        number of the last change they include
+        """
+        query = "SELECT {} FROM objects ORDER BY rowid".format(
+            ', '.join(map(self._quote, self.columns)))
+        with self._lock:
+            # Read first: a commit racing the queries is seen next time
+            self._data_version = self.data_version()
+            self._connection.execute("BEGIN")
+            try:
+                rows = self._connection.execute(query).fetchall()
+                seq = self._last_seq()
+            finally:
+                self._connection.execute("COMMIT")
+        return rows, seq
+
+    def _last_seq(self) -> int:
+        """ Sequence number of the last logged change, 0 if none
+        """
+        if not self.shared:
+            return 0
+        return self._connection.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def data_version(self) -> int:
+        """ Counter that changes whenever another connection commits
+        """
+        with self._lock:
+            return self._connection.execute(
+                "PRAGMA data_version").fetchone()[0]
+
+    def changed(self) -> bool:
+        """ Check, cheaply, if another connection committed since the
+        last snapshot() or changes_since()
+        """
+        return self.data_version() != self._data_version
+
+    def changes_since(self, seq: int) -> Optional[tuple]:
+        """ Return (last seq, rows saved, ids removed) for the changes of
+        other stores after `seq`, or None if the log no longer goes back
+        that far
+        """
+        query = "SELECT {} FROM objects WHERE id = ?".format(
+            ', '.join(map(self._quote, self.columns)))
+        with self._lock:
+            self._data_version = self.data_version()
+            self._connection.execute("BEGIN")
+            try:
+                first = self._connection.execute(
+                    "SELECT MIN(seq) FROM changes").fetchone()[0]
+                last = self._last_seq()
+                if last > seq and (first is None or first > seq + 1):
+                    return None
+                ids = dict.fromkeys(row[0] for row in self._connection.execute(
+                    "SELECT id FROM changes WHERE seq > ? AND origin != ? "
+                    "ORDER BY seq", (seq, self.origin)))
+                saved, removed = [], []
+                for obj_id in ids:
+                    row = self._connection.execute(
+                        query, (obj_id,)).fetchone()
+                    if row is None:
+                        removed.append(obj_id)
+                    else:
+                        saved.append(row)
+            finally:
+                self._connection.execute("COMMIT")
+        return last, saved, removed
+
+    def _log_changes(self, ids: Iterable[str]):
+        """ Log changed ids and trim the log to keep_changes entries
+        """
+        self._connection.executemany(
+            "INSERT INTO changes (id, origin) VALUES (?, ?)",
+            ((obj_id, self.origin) for obj_id in ids))
+        self._connection.execute(
+            "DELETE FROM changes WHERE seq <= ?",
+            (self._last_seq() - self.keep_changes,))
+
+    def _upsert_query(self) -> str:
+        """ Insert a row, or update it in place to keep its position
+        """
+        columns = ', '.join(map(self._quote, self.columns))
+        updates = ', '.join("{0} = excluded.{0}".format(self._quote(c))
+                            for c in self.columns[1:])
+        return "INSERT INTO objects ({}) VALUES ({}) ON CONFLICT(id) " \
+               "DO UPDATE SET {}".format(columns,
+                                         ', '.join('?' * len(self.columns)),
+                                         updates)
+
+    def apply(self, changes: Iterable[tuple]):
+        """ Apply ('save', row) and ('remove', id) changes in one
+        transaction
+        """
+        upsert = self._upsert_query()
+        ids = []
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                for op, value in changes:
+                    if op == 'save':
+                        self._connection.execute(upsert, value)
+                        ids.append(value[0])
+                    else:
+                        self._connection.execute(
+                            "DELETE FROM objects WHERE id = ?", (value,))
+                        ids.append(value)
+                if self.shared:
+                    self._log_changes(ids)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def replace_all(self, rows: Iterable[tuple]):
+        """ Replace the whole content of the store; a shared store only
+        upserts the rows, other processes may own rows this one lacks
+        """
+        if self.shared:
+            self.apply(('save', row) for row in rows)
+            return
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("DELETE FROM objects")
+                self._connection.executemany(self._upsert_query(), rows)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """ Close the connection
+        """
+        with self._lock:
+            self._connection.close()
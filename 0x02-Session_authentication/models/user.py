@@ -1,14 +1,20 @@
 #!/usr/bin/env python3
 """ User module
 """
-import hashlib
 from models.base import Base
+from models.hashers import hash_password, verify_password
+from os import getenv
 
 
 class User(Base):
     """ User class
     """
 
+    __slots__ = ('email', '_password', 'first_name', 'last_name')
+
+    indexed_attributes = ('email',)
+    sorted_attributes = ('email', 'created_at')
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
@@ -26,12 +32,14 @@ class User(Base):
 
     @password.setter
     def password(self, pwd: str):
-        """ Setter of a new password: encrypt in SHA256
+        """ Setter of a new password: encrypt with the
+            USER_PASSWORD_HASHER scheme, SHA256 by default
         """
         if pwd is None or type(pwd) is not str:
             self._password = None
         else:
-            self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
+            hasher = getenv('USER_PASSWORD_HASHER', 'sha256')
+            self._password = hash_password(pwd, hasher)
 
     def is_valid_password(self, pwd: str) -> bool:
         """ Validate a password
@@ -40,8 +48,7 @@ class User(Base):
             return False
         if self.password is None:
             return False
-        pwd_e = pwd.encode()
-        return hashlib.sha256(pwd_e).hexdigest().lower() == self.password
+        return verify_password(self.password, pwd)
 
     def display_name(self) -> str:
         """ Display User name based on email/first_name/last_name
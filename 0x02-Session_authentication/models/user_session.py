@@ -6,6 +6,10 @@ from models.base import Base
 class UserSession(Base):
     """UserSession class for storing session information"""
 
+    __slots__ = ('user_id', 'session_id')
+
+    indexed_attributes = ('session_id', 'user_id')
+
     def __init__(self, *args: list, **kwargs: dict):
         """Initialize UserSession with user_id and session_id"""
         super().__init__(*args, **kwargs)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+""" Several processes write users to the same store at once, then every
+process checks that it sees all the writes of the others
+
+Usage: ./stress_shared_store.py [PROCESSES] [USERS_PER_PROCESS]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+from models.user import User
+
+
+def worker(worker_id: int, processes: int, users: int, barrier) -> int:
+    """ Creates, updates and removes users, returns how many users of the
+    whole run this process sees at the end
+    """
+    User.load_from_file()
+    barrier.wait()
+    created = []
+    for i in range(users):
+        user = User(email=f"w{worker_id}-{i}@hbtn.io")
+        user.save()
+        created.append(user)
+        # Reads apply the changes of the other workers
+        other = (worker_id + 1) % processes
+        User.search({'email': f"w{other}-{i}@hbtn.io"})
+    for i, user in enumerate(created):
+        if i % 10 == 0:
+            user.remove()
+        else:
+            user.first_name = f"updated{worker_id}"
+            user.save()
+    barrier.wait()
+    return User.count()
+
+
+def run(storage: str, processes: int, users: int):
+    """ Runs the workers on a fresh store and reports lost writes
+    """
+    os.environ['MODEL_STORAGE'] = storage
+    expected = {f"w{w}-{i}@hbtn.io": f"updated{w}"
+                for w in range(processes) for i in range(users) if i % 10}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        context = multiprocessing.get_context('fork')
+        barrier = context.Manager().Barrier(processes, timeout=60)
+        with context.Pool(processes) as pool:
+            seen = pool.starmap(worker, [(w, processes, users, barrier)
+                                         for w in range(processes)])
+        User.load_from_file()
+        stored = {user.email: user.first_name for user in User.all()}
+    lost = sum(1 for email, name in expected.items()
+               if stored.get(email) != name)
+    lost += sum(1 for email in stored if email not in expected)
+    print("{:<7} {} processes x {} users: {} of {} writes lost, "
+          "workers see {}".format(storage, processes, users, lost,
+                                  len(expected), sorted(set(seen))))
+    return lost == 0 and seen == [len(expected)] * processes
+
+
+if __name__ == "__main__":
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    run('json', processes, users)
+    assert run('shared', processes, users)
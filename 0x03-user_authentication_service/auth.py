@@ -2,8 +2,9 @@
 """Auth module
 """
 
-import bcrypt
 from db import DB
+from hashers import hash_password, verify_password
+from os import getenv
 from user import User
 from uuid import uuid4
 from sqlalchemy.orm.exc import NoResultFound
@@ -11,7 +12,8 @@ from sqlalchemy.orm.exc import NoResultFound
 
 def _hash_password(password: str) -> bytes:
     """
-    Hashes a password using bcrypt.
+    Hashes a password with the AUTH_PASSWORD_HASHER scheme (bcrypt by
+    default, see hashers.py).
 
     Args:
         password (str): The password to hash.
@@ -19,9 +21,8 @@ def _hash_password(password: str) -> bytes:
     Returns:
         bytes: The salted hash of the password.
     """
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed_password
+    hasher = getenv('AUTH_PASSWORD_HASHER', 'bcrypt')
+    return hash_password(password, hasher).encode('utf-8')
 
 
 def _generate_uuid() -> str:
@@ -73,10 +74,7 @@ class Auth:
         """
         try:
             user = self._db.find_user_by(email=email)
-            is_valid_password = bcrypt.checkpw(
-                password.encode('utf-8'), user.hashed_password
-            )
-            return is_valid_password
+            return verify_password(user.hashed_password, password)
         except NoResultFound:
             return False
 